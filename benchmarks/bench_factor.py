@@ -0,0 +1,112 @@
+# coding=utf-8
+""" Замер производительности операций над факторами.
+
+Сравнивает векторизованные произведение (:func:`pyinference.inference.factor.Factor.product`) и деление
+(:func:`pyinference.inference.factor.Factor.divide`) факторов с прежними реализациями, перебиравшими назначения
+результата в цикле. Перемножаются два фактора на троичных переменных, половина переменных которых общая; размер
+результата - от 10^4 до 10^7 ячеек. Затем полученное совместное распределение делится на маргинальное распределение
+одной из переменных, как это происходит при выполнении запроса к сети со свидетельствами.
+
+Запуск::
+
+    python benchmarks/bench_factor.py [максимальный размер для цикла]
+
+Цикловая реализация выполняется только для факторов, не превышающих указанного размера (по умолчанию 10^6 ячеек),
+так как на больших факторах она работает десятки минут.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from pyinference.inference.factor import Factor, _itershape
+from pyinference.inference.variable import Variable
+
+__author__ = 'sejros'
+
+
+def _loop_product(one, other):
+    """ Прежняя реализация произведения факторов (перебор назначений).
+    """
+    cons = set(one.cons) | set(other.cons)
+    cond = (set(one.vars) | set(other.vars)) - cons
+    res = Factor(name="Product", cons=list(cons), cond=list(cond))
+    flat = res.cpd.flatten()
+    ass = _itershape(res.shape)
+    map1 = res._map(one)
+    map2 = res._map(other)
+    for i in range(len(flat)):
+        ass1 = tuple([ass[i][j] for j in map1])
+        ass2 = tuple([ass[i][j] for j in map2])
+        flat[i] = one.cpd[ass1] * other.cpd[ass2]
+    res.cpd = flat.reshape(res.shape)
+    return res
+
+
+def _loop_divide(one, other):
+    """ Прежняя реализация деления факторов (перебор назначений).
+    """
+    cond = set(one.cond) | set(other.cons)
+    cons = set(one.cons) - set(other.cons)
+    res = Factor(name="Conditional", cons=sorted(list(cons)), cond=sorted(list(cond)))
+    flat = res.cpd.flatten()
+    ass = _itershape(res.shape)
+    map1 = res._map(one)
+    map2 = res._map(other)
+    for i in range(len(flat)):
+        ass1 = tuple([ass[i][j] for j in map1])
+        ass2 = tuple([ass[i][j] for j in map2])
+        flat[i] = one.cpd[ass1] / other.cpd[ass2]
+    res.cpd = flat.reshape(res.shape)
+    res._normalize()
+    return res
+
+
+def _factors(n):
+    """ Два случайных фактора на троичных переменных, результат произведения которых содержит 3^n ячеек.
+    """
+    variables = [Variable(name='V%d' % i, terms=['low', 'mean', 'high']) for i in range(n)]
+    half = n // 2
+    one = Factor(name='F1', cons=variables[:half + 1])
+    one.cpd = np.random.rand(*one.shape)
+    other = Factor(name='F2', cons=variables[half:])
+    other.cpd = np.random.rand(*other.shape)
+    return one, other
+
+
+def _timeit(func, *args):
+    start = time.time()
+    res = func(*args)
+    return time.time() - start, res
+
+
+def _report(name, size, vec_time, loop_time=None):
+    if loop_time is None:
+        print '%8s %10d %12.4f %12s %10s' % (name, size, vec_time, '-', '-')
+    else:
+        print '%8s %10d %12.4f %12.4f %10.1f' % (name, size, vec_time, loop_time, loop_time / vec_time)
+
+
+def main(limit=10 ** 6):
+    print '%8s %10s %12s %12s %10s' % ('op', 'cells', 'vector, s', 'loop, s', 'speedup')
+    for n in (9, 11, 13, 15):
+        one, other = _factors(n)
+        vec_time, joint = _timeit(one.product, other)
+        evidence = Factor(name='E', cons=[joint.vars[-1]])
+        evidence.cpd = np.random.rand(*evidence.shape)
+        div_time, cond = _timeit(joint.divide, evidence)
+        if joint.cpd.size <= limit:
+            loop_time, ref = _timeit(_loop_product, one, other)
+            assert np.allclose(joint.cpd, ref.cpd)
+            _report('product', joint.cpd.size, vec_time, loop_time)
+            loop_time, ref = _timeit(_loop_divide, joint, evidence)
+            assert np.allclose(cond.cpd, ref.cpd)
+            _report('divide', joint.cpd.size, div_time, loop_time)
+        else:
+            _report('product', joint.cpd.size, vec_time)
+            _report('divide', joint.cpd.size, div_time)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,40 @@
+# coding=utf-8
+""" Замер производительности классификатора :class:`pyinference.fuzzy.set.Partition`.
+
+Для классификаторов с 10, 100 и 1000 пиками выводится время построения, время фаззификации массива случайных
+значений в разреженную матрицу (:func:`pyinference.fuzzy.set.Partition.fuzzify_batch`) и время классификации
+(:func:`pyinference.fuzzy.set.Partition.classify_batch`).
+
+Запуск::
+
+    python benchmarks/bench_set.py [число значений]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from pyinference.fuzzy.set import Partition
+
+__author__ = 'sejros'
+
+
+def _timeit(func, *args, **kwargs):
+    start = time.time()
+    res = func(*args, **kwargs)
+    return time.time() - start, res
+
+
+def main(n=10 ** 6):
+    values = np.random.rand(n)
+    print '%8s %10s %12s %12s' % ('peaks', 'build, s', 'fuzzify, s', 'classify, s')
+    for peaks in (10, 100, 1000):
+        build_time, partition = _timeit(Partition, peaks=np.linspace(0.0, 1.0, peaks).tolist(), overlap=0.5)
+        fuzzify_time, _ = _timeit(partition.fuzzify_batch, values)
+        classify_time, _ = _timeit(partition.classify_batch, values)
+        print '%8d %10.4f %12.4f %12.4f' % (peaks, build_time, fuzzify_time, classify_time)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,64 @@
+# coding=utf-8
+""" Замер памяти, занимаемой параметрическими нечеткими подмножествами.
+
+Создает по n экземпляров :class:`pyinference.fuzzy.subset.Trapezoidal`, :class:`pyinference.fuzzy.subset.Triangle` и
+:class:`pyinference.fuzzy.subset.Gaussian` и выводит средний размер одного экземпляра в байтах вместе со всеми
+объектами, на которые он ссылается (объекты, общие для нескольких экземпляров, учитываются один раз). Размер
+замеряется сразу после создания, после вычисления функции принадлежности в одной точке и после вычисления
+центроида, когда у подмножества созданы область определения и точки излома.
+
+Запуск::
+
+    python benchmarks/bench_subset.py [число экземпляров]
+"""
+
+import gc
+import sys
+import types
+
+from pyinference.fuzzy.subset import Trapezoidal, Triangle, Gaussian
+
+__author__ = 'sejros'
+
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.ClassType)
+
+
+def _deep_size(objects):
+    """ Суммарный размер объектов objects и всех достижимых из них объектов, кроме классов, модулей и функций.
+    """
+    seen = set()
+    stack = list(objects)
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIP):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        stack.extend(gc.get_referents(obj))
+    return size
+
+
+def _subsets(n):
+    return [
+        ('Trapezoidal', [Trapezoidal((i, i + 1.0, i + 2.0, i + 3.0)) for i in xrange(n)]),
+        ('Triangle', [Triangle(i, i + 1.0, i + 2.0) for i in xrange(n)]),
+        ('Gaussian', [Gaussian(i, 1.0) for i in xrange(n)]),
+    ]
+
+
+def main(n=1000):
+    print '%12s %10s %10s %10s' % ('class', 'created', 'value', 'centr')
+    for name, subsets in _subsets(n):
+        created = _deep_size(subsets) / float(n)
+        for subset in subsets:
+            subset.value(subset.mode())
+        evaluated = _deep_size(subsets) / float(n)
+        for subset in subsets:
+            subset.centr()
+        materialized = _deep_size(subsets) / float(n)
+        print '%12s %10.0f %10.0f %10.0f' % (name, created, evaluated, materialized)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,52 @@
+# coding=utf-8
+""" Замер производительности и точности табличных норм.
+
+Сравнивает вычисление параметрических норм (:class:`pyinference.fuzzy.tnorm.Tnorm3` -
+:class:`pyinference.fuzzy.tnorm.Tnorm7`) и :class:`pyinference.fuzzy.tnorm.MinMax` с их табличными версиями
+(:class:`pyinference.fuzzy.tnorm.LookupNorm`) размером 256 и 1024 узлов по ближайшему узлу и с билинейной
+интерполяцией. Норма вычисляется для массива случайных пар уровней принадлежности. Для каждой таблицы выводится время
+построения, время вычисления, ускорение относительно точной нормы, наибольшая ошибка на случайных парах и оценка
+ошибки :func:`pyinference.fuzzy.tnorm.LookupNorm.error`.
+
+Запуск::
+
+    python benchmarks/bench_tnorm.py [число пар]
+"""
+
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from pyinference.fuzzy.tnorm import MinMax, Tnorm3, Tnorm4, Tnorm5, Tnorm6, Tnorm7, LookupNorm
+
+__author__ = 'sejros'
+
+
+def _timeit(func, *args):
+    start = time.time()
+    res = func(*args)
+    return time.time() - start, res
+
+
+def main(n=10 ** 6):
+    warnings.simplefilter('ignore', RuntimeWarning)
+    i = np.random.rand(n)
+    j = np.random.rand(n)
+    print '%8s %6s %8s %10s %10s %10s %8s %10s %10s' % (
+        'norm', 'size', 'mode', 'build, s', 'exact, s', 'table, s', 'speedup', 'max error', 'error()')
+    for name, tnorm in (('MinMax', MinMax()), ('Tnorm3', Tnorm3(2.0)), ('Tnorm4', Tnorm4(2.0)),
+                        ('Tnorm5', Tnorm5(2.0)), ('Tnorm6', Tnorm6(2.0)), ('Tnorm7', Tnorm7(0.5))):
+        exact_time, exact = _timeit(tnorm.norm, i, j)
+        for size in (256, 1024):
+            for interpolate in (False, True):
+                build_time, lut = _timeit(LookupNorm, tnorm, size, interpolate)
+                table_time, res = _timeit(lut.norm, i, j)
+                print '%8s %6d %8s %10.4f %10.4f %10.4f %8.1f %10.2e %10.2e' % (
+                    name, size, 'bilinear' if interpolate else 'nearest', build_time, exact_time, table_time,
+                    exact_time / table_time, np.nanmax(np.abs(res - exact)), lut.error())
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
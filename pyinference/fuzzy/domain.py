@@ -4,6 +4,7 @@
 """
 
 import pyinference.fuzzy
+import numpy as np
 
 
 class Domain(object):
@@ -30,6 +31,23 @@ class Domain(object):
         """
         pass
 
+    def as_array(self):
+        """Возвращает элементы носителя в виде массива numpy.
+        """
+        return np.array(list(self))
+
+    def contains(self, items):
+        """Векторная проверка принадлежности элементов носителю.
+
+        Параметры:
+            items (:class:`numpy.ndarray`): массив проверяемых элементов.
+
+        Возвращает:
+            Массив логических значений той же формы, что и items.
+        """
+        items = np.asarray(items)
+        return np.array([item in self for item in items.flat], dtype=bool).reshape(items.shape)
+
 
 class RationalRange(Domain):
     """Данный класс реализует носитель нечеткого подмножества в виде отрезка действительной оси.
@@ -62,6 +80,12 @@ class RationalRange(Domain):
         2.625
         3.0
 
+    Узлы сетки вычисляются один раз функцией :func:`numpy.linspace` (см. :func:`as_array`) и кэшируются до
+    изменения любого из атрибутов begin, end или acc. Поэтому обе границы интервала всегда входят в сетку, а
+    погрешность округления не накапливается от узла к узлу.
+    Каждое такое изменение также увеличивает счетчик ``_version``, по которому зависящие от носителя кэши
+    (например, кэш функционалов :class:`pyinference.fuzzy.subset.Subset`) определяют, что устарели.
+
     Attributes:
         begin:
         end:
@@ -74,16 +98,38 @@ class RationalRange(Domain):
         self.end = float(end)
         self.acc = acc
 
+    def __setattr__(self, name, value):
+        super(RationalRange, self).__setattr__(name, value)
+        if name in ('begin', 'end', 'acc'):
+            self.__dict__['_grid'] = None
+            self.__dict__['_version'] = self.__dict__.get('_version', 0) + 1
+
     def __iter__(self):
-        if self.begin == self.end:
-            for i in range(self.acc):
-                yield self.begin
-        else:
-            delta = (self.end - self.begin) / self.acc
-            i = self.begin
-            while i <= self.end:
-                yield i
-                i += delta
+        for i in self.as_array().tolist():
+            yield i
+
+    def as_array(self):
+        """Возвращает узлы сетки носителя в виде массива numpy (только для чтения).
+
+        Массив строится при первом обращении и кэшируется до изменения атрибутов begin, end или acc.
+
+        Синтаксис:
+            >>> B = RationalRange(end=3.0, acc=3)
+            >>> B.as_array()
+            array([0., 1., 2., 3.])
+            >>> B.end = 6.0
+            >>> B.as_array()
+            array([0., 2., 4., 6.])
+        """
+        grid = self.__dict__.get('_grid')
+        if grid is None:
+            if self.begin == self.end:
+                grid = np.repeat(float(self.begin), int(self.acc))
+            else:
+                grid = np.linspace(self.begin, self.end, int(self.acc) + 1)
+            grid.flags.writeable = False
+            self.__dict__['_grid'] = grid
+        return grid
 
     def card(self):
         return len(self)
@@ -96,6 +142,18 @@ class RationalRange(Domain):
             return True
         return False
 
+    def contains(self, items):
+        """Векторная проверка принадлежности элементов носителю.
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> B = RationalRange(end=3.0)
+            >>> B.contains(np.array([-1.0, 0.0, 1.5, 3.5]))
+            array([False,  True,  True, False])
+        """
+        items = np.asarray(items)
+        return (items >= self.begin) & (items <= self.end)
+
     def __abs__(self):
         return self.card()
 
@@ -133,3 +191,15 @@ class IntegerRange(RationalRange):
         if int(item) == item and self.begin <= item <= self.end:
             return True
         return False
+
+    def contains(self, items):
+        items = np.asarray(items)
+        return super(IntegerRange, self).contains(items) & (np.floor(items) == items)
+
+    def as_array(self):
+        grid = self.__dict__.get('_grid')
+        if grid is None:
+            grid = np.arange(self.begin, self.end + 1)
+            grid.flags.writeable = False
+            self.__dict__['_grid'] = grid
+        return grid
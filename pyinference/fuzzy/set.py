@@ -24,12 +24,208 @@ from pyinference.fuzzy.subset import Trapezoidal
 from pyinference.fuzzy.subset import Gaussian
 from pyinference.fuzzy.subset import Triangle
 from pyinference.fuzzy.subset import Subset
+from pyinference.fuzzy.subset import _trapezoid
+from pyinference.fuzzy.tnorm import MinMax
 import pyinference.fuzzy.domain
 
 import math
+import numpy as np
 import pylab as p
 
 
+def _params(sub):
+    """ Возвращает параметры (a, b, c, d) трапециевидного подмножества или None для подмножеств других видов.
+    """
+    if type(sub) not in (Trapezoidal, Triangle):
+        return None
+    begin, end = sub.support()
+    return begin, sub.begin_tol, sub.end_tol, end
+
+
+def _interval_tree(starts, ends, items):
+    """ Строит центрированное дерево отрезков [starts[k], ends[k]] с номерами k из массива items.
+
+    Центр узла - медиана конечных границ его отрезков. В узле остаются отрезки, содержащие центр: их номера
+    упорядочены по возрастанию начал и по убыванию концов; отрезки левее и правее центра образуют поддеревья.
+    Каждый отрезок хранится ровно в одном узле, поэтому дерево занимает O(n) памяти.
+    """
+    if not len(items):
+        return None
+    bounds = np.concatenate((starts[items], ends[items]))
+    bounds = bounds[np.isfinite(bounds)]
+    center = float(np.median(bounds)) if len(bounds) else 0.0
+    left = ends[items] < center
+    right = starts[items] > center
+    here = items[~(left | right)]
+    by_start = here[np.argsort(starts[here], kind='mergesort')]
+    by_end = here[np.argsort(-ends[here], kind='mergesort')]
+    return (center, by_start.tolist(), starts[by_start].tolist(), by_end.tolist(), ends[by_end].tolist(),
+            _interval_tree(starts, ends, items[left]), _interval_tree(starts, ends, items[right]))
+
+
+def _stab(node, val):
+    """ Возвращает номера отрезков дерева :func:`_interval_tree`, содержащих точку val.
+
+    В каждом узле на пути от корня просматриваются только отрезки, заведомо содержащие точку, и один лишний,
+    поэтому поиск занимает O(log n + k), где k - число найденных отрезков.
+    """
+    res = []
+    while node is not None:
+        center, by_start, starts, by_end, ends, left, right = node
+        if val < center:
+            i = 0
+            while i < len(starts) and starts[i] <= val:
+                i += 1
+            res.extend(by_start[:i])
+            node = left
+        elif val > center:
+            i = 0
+            while i < len(ends) and ends[i] >= val:
+                i += 1
+            res.extend(by_end[:i])
+            node = right
+        else:
+            res.extend(by_start)
+            break
+    return res
+
+
+def _fit_overlap(sketch, peaks, fuzziness):
+    """ Подбирает параметр overlap классификатора :class:`Partition` с пиками peaks (включающими границы
+    области определения) так, чтобы доля значений на скатах термов по оценке sketch была равна fuzziness.
+
+    Скат между соседними пиками p и q занимает отрезок [p + d / (t + 2), q - d / (t + 2)], где d = q - p и
+    t = tan(overlap * pi / 2); доля значений на скатах монотонно растет с overlap, поэтому используется бисекция.
+    """
+    left, right = peaks[:-1], peaks[1:]
+
+    def share(overlap):
+        t = math.tan(overlap * math.pi / 2)
+        margin = (right - left) / (t + 2)
+        return float((sketch.cdf(right - margin) - sketch.cdf(left + margin)).clip(0.0).sum())
+
+    lo, hi = 0.0, 1.0
+    for _ in xrange(50):
+        middle = (lo + hi) / 2
+        if share(middle) < fuzziness:
+            lo = middle
+        else:
+            hi = middle
+    return (lo + hi) / 2
+
+
+def _overlap(one, params):
+    """ Возвращает точные площади пересечений (по минимуму) трапеции one = (a, b, c, d) с трапециями params (n x 4).
+
+    Между соседними точками излома обеих трапеций функции принадлежности линейны, поэтому площадь под минимумом
+    на каждом отрезке вычисляется по формуле трапеций с учетом точки пересечения графиков. Значения на концах
+    отрезка восстанавливаются по двум внутренним точкам, так как в вертикальных скатах (a = b или c = d) значение
+    в самой точке излома не совпадает с пределом изнутри отрезка.
+    """
+    x = np.sort(np.concatenate((np.broadcast_to(one, params.shape), params), axis=1), axis=1)
+    x0, x1 = x[:, :-1], x[:, 1:]
+    quarter = (x1 - x0) / 4
+    columns = [params[:, [i]] for i in xrange(4)]
+    f1, f3 = _trapezoid(x0 + quarter, *one), _trapezoid(x1 - quarter, *one)
+    g1, g3 = _trapezoid(x0 + quarter, *columns), _trapezoid(x1 - quarter, *columns)
+    f0, f1 = (3 * f1 - f3) / 2, (3 * f3 - f1) / 2
+    g0, g1 = (3 * g1 - g3) / 2, (3 * g3 - g1) / 2
+    d0, d1 = f0 - g0, f1 - g1
+    m0, m1 = np.minimum(f0, g0), np.minimum(f1, g1)
+    cross = d0 * d1 < 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t = np.where(cross, d0 / (d0 - d1), 1.0)
+    xc = x0 + t * (x1 - x0)
+    mc = np.where(cross, f0 + t * (f1 - f0), m1)
+    area = (m0 + mc) / 2 * (xc - x0) + (mc + m1) / 2 * (x1 - xc)
+    return area.sum(axis=1)
+
+
+class TermRegistry(object):
+    """ Упорядоченный реестр имен термов.
+
+    Каждое имя при первом добавлении получает целочисленный код - номер в порядке добавления; повторное добавление
+    код не меняет. Классификатор (:class:`FuzzySet`) и связанная с ним переменная
+    (:class:`pyinference.inference.variable.Variable`) используют один и тот же реестр, поэтому код терма
+    совпадает с номером столбца в :func:`FuzzySet.memberships`, с результатом
+    :func:`FuzzySet.classify_batch` (index=True) и с индексом вдоль оси переменной в распределениях факторов.
+
+    Синтаксис:
+        >>> r = TermRegistry(['low', 'high'])
+        >>> r.add('middle')
+        2
+        >>> r.code('high'), r[2], len(r), list(r)
+        (1, 'middle', 3, ['low', 'high', 'middle'])
+        >>> r.codes(['middle', 'low', 'middle']).tolist()
+        [2, 0, 2]
+
+    Поля класса:
+        names (`list`): имена термов в порядке их кодов
+
+    Именованные параметры:
+        names (`list`): начальный список имен
+    """
+
+    def __init__(self, names=None):
+        self.names = []
+        self._codes = {}
+        self._labels = None
+        for name in names or []:
+            self.add(name)
+
+    def add(self, name):
+        """ Добавляет имя в реестр (если его там еще нет) и возвращает его код.
+        """
+        if name not in self._codes:
+            self._codes[name] = len(self.names)
+            self.names.append(name)
+            self._labels = None
+        return self._codes[name]
+
+    def code(self, name):
+        """ Возвращает код имени.
+
+        Исключения:
+            `ValueError`: если имя не входит в реестр.
+        """
+        try:
+            return self._codes[name]
+        except KeyError:
+            raise ValueError('%r is not a registered term' % (name,))
+
+    def codes(self, names):
+        """ Векторный аналог :func:`code`: возвращает массив кодов той же формы, что и массив имен names.
+
+        Обращения к словарю выполняются только для различных имен, а не для каждого элемента массива.
+        """
+        names = np.asarray(names)
+        if not names.size:
+            return np.zeros(names.shape, dtype=np.intp)
+        unique, inverse = np.unique(names, return_inverse=True)
+        table = np.array([self.code(name) for name in unique.tolist()], dtype=np.intp)
+        return table[inverse].reshape(names.shape)
+
+    def labels(self):
+        """ Возвращает массив имен (dtype=object), индексируемый кодами; элемент с индексом -1 равен None.
+        """
+        if self._labels is None:
+            self._labels = np.empty(len(self.names) + 1, dtype=object)
+            self._labels[:-1] = self.names
+        return self._labels
+
+    def __getitem__(self, code):
+        return self.names[code]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return name in self._codes
+
+
 class FuzzySet(object):
     """Нечеткое множество.
 
@@ -51,10 +247,23 @@ class FuzzySet(object):
         sets (`dict`): Ассоциативный массив, содержащий, соответственно, имя и объект типа
             :class:`pyinference.fuzzy.subset.Subset`, для каждого терма нечеткого множества.
 
+        terms (:class:`TermRegistry`): реестр имен термов в порядке их добавления (см. :func:`add_term`).
+            Коды термов задают порядок перебора термов и столбцов в :func:`memberships`.
+
+        names (`list`): имена термов в порядке их кодов (``terms.names``)
+
         domain (:class:`pyinference.fuzzy.domain.Domain`): носитель нечеткого множества
 
         name (`str`): имя классификатора
 
+    Для быстрой фаззификации классификатор хранит индекс по носителям термов ([domain.begin, domain.end], см.
+    :func:`pyinference.fuzzy.subset.Subset.support`): дерево отрезков, в котором каждый терм записан один раз
+    (O(n) памяти). Поэтому :func:`classify` вычисляет только функции принадлежности термов, носитель которых
+    содержит точку: O(log n + k) вместо O(n), где k - число таких термов. Вне своего носителя принадлежность
+    терму считается нулевой. :func:`add_term` только помечает индекс устаревшим, а строится он при первой
+    фаззификации после изменения набора термов, поэтому добавление n термов занимает O(n). Если носитель терма
+    изменен после добавления, следует снова вызвать :func:`add_term`.
+
     Именованные параметры:
         begin (`float`): начало интервала определения классификатора
 
@@ -70,21 +279,27 @@ class FuzzySet(object):
             domain = pyinference.fuzzy.domain.RationalRange(begin, end)
         self.domain = domain
         self.sets = {}
+        self.terms = TermRegistry()
         self.name = name
+        self._indexed = False
+
+    @property
+    def names(self):
+        return self.terms.names
 
     def __iter__(self):
-        """ Процедура перебора термов классификатора.
+        """ Процедура перебора термов классификатора (в порядке их кодов, см. :class:`TermRegistry`).
 
         Syntax:
             >>> C = Partition(peaks=[0.0, 0.3, 1.0])
             >>> for i in C:
             ...     print '%0.3f' % i.centr()
             ...
-            0.433
             0.100
-            0.766
+            0.433
+            0.767
         """
-        for i in self.sets.iterkeys():
+        for i in self.names:
             yield self[i]
 
     def __len__(self):
@@ -166,7 +381,66 @@ class FuzzySet(object):
                 ключ ассоциативного массива Sets
 
         """
+        self.terms.add(name)
         self.sets[name] = sub
+        self._indexed = False
+
+    def _ensure_index(self):
+        """ Строит индекс термов, если набор термов изменился после его последнего построения.
+        """
+        if not self._indexed:
+            self._build_index()
+
+    def _build_index(self):
+        """ Строит индекс по носителям термов: дерево отрезков (см. :func:`_interval_tree`), массив носителей
+        и параметры трапеций.
+        """
+        self._indexed = True
+        self._term_grid = None
+        params = [_params(self.sets[name]) for name in self.names]
+        if None in params:
+            self._trapezoids = None
+        else:
+            self._trapezoids = np.array(params, dtype=float).reshape((-1, 4))
+        supports = np.array([self.sets[name].support() for name in self.names], dtype=float).reshape((-1, 2))
+        self._supports = supports
+        self._tree = _interval_tree(supports[:, 0], supports[:, 1], np.arange(len(supports)))
+
+    def _grid(self):
+        """ Возвращает сетку области определения классификатора и матрицу принадлежностей ее узлов всем термам.
+
+        Матрица формы (число термов, число узлов) строится при первом обращении и хранится до изменения
+        области определения или набора термов.
+        """
+        self._ensure_index()
+        key = (id(self.domain), getattr(self.domain, '_version', 0))
+        if self._term_grid is None or self._term_grid[0] != key:
+            grid = self.domain.as_array()
+            self._term_grid = key, grid, np.ascontiguousarray(self.memberships(grid).T)
+        return self._term_grid[1:]
+
+    def _overlaps(self, val):
+        """ Возвращает мощности пересечений нечеткого подмножества val со всеми термами (в порядке names).
+
+        Пересечение строится нормой алгебры подмножества val, как и оператор ``val & term``. Если норма -
+        минимум, а val и все термы - трапеции, площади вычисляются точно; иначе - по формуле трапеций на сетке
+        области определения классификатора одним векторным проходом по кэшированной матрице принадлежностей
+        термов (см. :func:`_grid`).
+        """
+        self._ensure_index()
+        tnorm = val._algebra.tnorm
+        one = _params(val)
+        if isinstance(tnorm, MinMax) and one is not None and self._trapezoids is not None:
+            return _overlap(np.array(one), self._trapezoids)
+        grid, terms = self._grid()
+        mu = np.clip(tnorm.norm(terms, val.value(grid)), 0.0, 1.0)
+        return np.trapz(mu, grid, axis=1)
+
+    def _candidates(self, val):
+        """ Возвращает номера (в names) термов, носитель которых содержит точку val, в порядке возрастания.
+        """
+        self._ensure_index()
+        return sorted(_stab(self._tree, val))
 
     def find(self, val, term):
         """Возвращает значение принадлежности точки x терму term.
@@ -208,6 +482,8 @@ class FuzzySet(object):
 
         Будучи вызванным у квалификатора, соответствует квалификации точного
         значения или значения, выраженного нечетким подмножеством или числом.
+        Нечеткое значение относится к терму, мощность пересечения с которым наибольшая; пересечения со всеми
+        термами вычисляются сразу, без построения промежуточных подмножеств (см. :func:`_overlaps`).
 
         Синтаксис:
             >>> from pyinference.fuzzy.subset import Gaussian, Triangle
@@ -228,23 +504,97 @@ class FuzzySet(object):
             Имя классификатора, наиболее соответствующего данной точке.
 
         """
-        res = {}
         if isinstance(val, Subset):
-            for i in self.sets.iterkeys():
-                j = val & self.sets[i]
-                res[i] = j.card()
+            res = enumerate(self._overlaps(val).tolist())
         else:
-            for i in self.sets.iterkeys():
-                j = self.sets[i].value(val)
-                res[i] = j
+            res = ((k, self.sets[self.names[k]].value(val)) for k in self._candidates(val))
+        # термы перебираются в порядке кодов; при равенстве, как и в classify_batch, выбирается первый
         maxim = 0
         name = None
-        for i in res.iterkeys():
-            if res[i] > maxim:
-                maxim = res[i]
-                name = i
+        for k, mu in res:
+            if mu > maxim:
+                maxim = mu
+                name = self.names[k]
         return name
 
+    def memberships(self, values):
+        """ Возвращает матрицу принадлежностей массива точек всем термам классификатора.
+
+        Функция принадлежности каждого терма вычисляется средствами numpy один раз и только для точек, попадающих
+        в его носитель (точки предварительно упорядочиваются), поэтому метод предназначен для фаззификации больших
+        наборов четких значений классификаторами с большим числом термов.
+
+        Синтаксис:
+            >>> C = Partition(peaks=[0.0, 0.3, 1.0])
+            >>> C.names
+            ['0', '1', '2']
+            >>> C.memberships([0.0, 0.12, 0.65]).round(3).tolist()
+            [[1.0, 0.0, 0.0], [0.6, 0.4, 0.0], [0.0, 0.5, 0.5]]
+
+        Параметры:
+            values (`list` or :class:`numpy.ndarray`): четкие значения (элементы области определения)
+
+        Возвращает:
+            Массив формы values.shape + (число термов,); столбец k содержит принадлежности терму names[k].
+        """
+        values = np.asarray(values, dtype=float)
+        res = np.zeros((values.size, len(self.names)))
+        for k, positions, mu in self._fuzzify(values.ravel()):
+            res[positions, k] = mu
+        return res.reshape(values.shape + (len(self.names),))
+
+    def _fuzzify(self, flat):
+        """ Перебирает термы, носитель которых содержит хотя бы одну точку одномерного массива flat.
+
+        Возвращает тройки (номер терма, номера точек в flat, принадлежности этих точек терму).
+        """
+        self._ensure_index()
+        order = flat.argsort(kind='mergesort')
+        ordered = flat[order]
+        # после сортировки точки, попадающие в носитель терма, образуют непрерывный отрезок массива
+        lo = np.searchsorted(ordered, self._supports[:, 0], side='left')
+        hi = np.searchsorted(ordered, self._supports[:, 1], side='right')
+        for k, name in enumerate(self.names):
+            if hi[k] > lo[k]:
+                yield k, order[lo[k]:hi[k]], self.sets[name].value(ordered[lo[k]:hi[k]])
+
+    def classify_batch(self, values, index=False):
+        """ Векторный аналог :func:`classify` для массива четких значений.
+
+        Для каждого значения выбирается терм с наибольшей принадлежностью; при равенстве принадлежностей -
+        терм, добавленный раньше. Как и :func:`memberships`, метод вычисляет функции принадлежности термов только
+        в точках их носителей, но не строит матрицу принадлежностей, поэтому затраты памяти не зависят от числа
+        термов. Значениям, не принадлежащим ни одному терму, соответствует None (или -1).
+
+        Синтаксис:
+            >>> A = Partition(begin=10, end=20, peaks=[10, 13, 18, 20], overlap=0.2)
+            >>> A.classify_batch([14, 17, 25]).tolist()
+            ['1', '2', None]
+            >>> A.classify_batch([14, 17, 25], index=True).tolist()
+            [1, 2, -1]
+
+        Параметры:
+            values (`list` or :class:`numpy.ndarray`): четкие значения (элементы области определения)
+
+        Именованные параметры:
+            index (`bool`): вернуть коды термов (см. :class:`TermRegistry`) вместо их имен
+
+        Возвращает:
+            Массив имен термов (dtype=object) или их номеров той же формы, что и values.
+        """
+        values = np.asarray(values, dtype=float)
+        # матрица принадлежностей не строится: для каждой точки хранятся только лучший терм и его принадлежность
+        best = np.zeros(values.size)
+        res = np.full(values.size, -1, dtype=np.intp)
+        for k, positions, mu in self._fuzzify(values.ravel()):
+            better = mu > best[positions]
+            best[positions[better]] = mu[better]
+            res[positions[better]] = k
+        res = res.reshape(values.shape)
+        if index:
+            return res
+        return self.terms.labels()[res]
+
     def plot(self, verbose=False, subplot=p):
         """ Отображает нечеткое множество графически. Все термы представляются на одном графике.
 
@@ -258,11 +608,9 @@ class FuzzySet(object):
             subplot (:class:`pylab.plot`): если требуется отобразить данное множество на подграфике,
                 можно воспользоваться данным параметром.
         """
-        labels = []
-        for name, sub in self.sets.iteritems():
+        for sub in self:
             sub.plot(verbose=verbose, subplot=subplot)
-            labels.append(name)
-        subplot.legend(labels, loc='upper right')
+        subplot.legend(self.names, loc='upper right')
         subplot.plot(self.domain.begin, 1.01)
         subplot.plot(self.domain.end + (self.domain.end - self.domain.begin) / 5, -0.01)
         subplot.grid()
@@ -457,6 +805,103 @@ class GaussianClassifier(FuzzySet):
             mode += step
 
 
+class QuantileSketch(object):
+    """ Потоковая оценка квантилей с ограниченным объемом памяти.
+
+    Значения поступают порциями (:func:`update`) и хранятся в нескольких уровнях: элемент уровня l представляет
+    2^l исходных значений. Когда на уровне накапливается больше k элементов, они упорядочиваются, и каждый второй
+    (со случайно выбранного из двух первых) переносится на следующий уровень, а остальные отбрасываются. Поэтому
+    память ограничена величиной порядка k * log2(n / k) при любом числе значений n, а набор данных может не
+    помещаться в оперативную память. Ошибка ранга квантиля - порядка долей процента при k = 256 и возрастает
+    с уменьшением k. Наименьшее и наибольшее значения хранятся точно; пропуски (NaN) игнорируются.
+
+    Синтаксис:
+        >>> import numpy as np
+        >>> sketch = QuantileSketch(k=64)
+        >>> for chunk in np.array_split(np.arange(10001.0), 10):
+        ...     sketch = sketch.update(chunk)
+        >>> sketch.count, sketch.min, sketch.max
+        (10001, 0.0, 10000.0)
+        >>> abs(sketch.quantile(0.5) - 5000) < 500
+        True
+
+    Именованные параметры:
+        k (`int`): наибольшее число элементов уровня
+
+        seed (`int`): начальное значение генератора случайных чисел (результат воспроизводим)
+    """
+
+    def __init__(self, k=256, seed=0):
+        if k < 2:
+            raise ValueError('k must be at least 2')
+        self.k = k
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = [np.empty(0)]
+        self._random = np.random.RandomState(seed)
+
+    def update(self, values):
+        """ Добавляет порцию значений (число, список или массив numpy любой формы) и возвращает сам объект.
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.count += values.size
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self._levels[0] = np.concatenate((self._levels[0], values))
+            self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self._levels):
+            items = self._levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                # при нечетном числе элементов наибольший остается на уровне
+                rest = len(items) % 2
+                self._levels[level] = items[len(items) - rest:]
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                promoted = items[self._random.randint(2):len(items) - rest:2]
+                self._levels[level + 1] = np.concatenate((self._levels[level + 1], promoted))
+            level += 1
+
+    def _weighted(self):
+        """ Возвращает упорядоченные хранимые элементы и накопленные веса.
+        """
+        items = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** l) for l, level in enumerate(self._levels)])
+        order = items.argsort(kind='mergesort')
+        return items[order], np.cumsum(weights[order])
+
+    def quantile(self, q):
+        """ Возвращает оценку квантиля (или массива квантилей) уровня q, 0 <= q <= 1.
+
+        Исключения:
+            `ValueError`: если в оценку еще не поступило ни одного значения.
+        """
+        if not self.count:
+            raise ValueError('sketch is empty')
+        q = np.asarray(q, dtype=float)
+        items, cumulative = self._weighted()
+        index = np.minimum(np.searchsorted(cumulative, q * cumulative[-1], side='left'), len(items) - 1)
+        res = np.where(q <= 0, self.min, np.where(q >= 1, self.max, items[index]))
+        return res[()] if res.ndim == 0 else res
+
+    def cdf(self, x):
+        """ Возвращает оценку доли значений, не превышающих x (число или массив).
+        """
+        if not self.count:
+            raise ValueError('sketch is empty')
+        items, cumulative = self._weighted()
+        index = np.searchsorted(items, x, side='right')
+        res = np.where(index > 0, cumulative[np.maximum(index - 1, 0)], 0.0) / cumulative[-1]
+        return res[()] if res.ndim == 0 else res
+
+
 class Partition(FuzzySet):
     """ Данный класс создает линейный неравномерный классификатор по точкам, указанным в параметрах.
 
@@ -486,8 +931,8 @@ class Partition(FuzzySet):
         20.0
         >>> A.name
         'sample classifier'
-        >>> A.sets.keys()
-        ['1', '0', '3', '2']
+        >>> A.names
+        ['0', '1', '2', '3']
         >>> A['0'].mode()
         10.0
         >>> A['0'].domain.begin
@@ -515,6 +960,12 @@ class Partition(FuzzySet):
         overlap (`float`): параметр, задающий крутизну скатов ФП термов и ширину интервала
             толерантности. При overlap = 0 классификатор становится четким, при
             overlap = 1 ФП термов становятся треугольными.
+
+    Так как в каждой точке отличны от нуля принадлежности не более чем двух соседних термов, классификатор
+    фаззифицирует значения специальным ядром (см. :func:`fuzzify` и :func:`fuzzify_batch`): двоичным поиском по
+    упорядоченным началам интервалов толерантности находится левый из двух термов, после чего вычисляются только
+    их функции принадлежности. Ядро используется, пока термы остаются трапециями, удовлетворяющими этому условию
+    (в том числе после :func:`add_term`); иначе методы переходят к общему алгоритму :class:`FuzzySet`.
     """
 
     def __init__(self, begin=0.0, end=1.0, domain=None,
@@ -530,6 +981,7 @@ class Partition(FuzzySet):
         peaks.insert(0, begin)
         peaks.append(end)
         overlap = math.tan(float(overlap) * math.pi / 2)
+        # термы регистрируются напрямую, а индекс строится один раз, а не при каждом add_term
         for i in range(len(peaks) - 2):
             left = (peaks[i + 1] - peaks[i]) / (overlap + 2)
             right = (peaks[i + 2] - peaks[i + 1]) / (overlap + 2)
@@ -537,6 +989,157 @@ class Partition(FuzzySet):
             begin_tol = peaks[i + 1] - left
             end_tol = peaks[i + 1] + right
             end = peaks[i + 1] + right * (1 + overlap)
-            self.add_term(Trapezoidal((begin, begin_tol, end_tol, end)),
-                          name=str(i))
+            self.terms.add(str(i))
+            self.sets[str(i)] = Trapezoidal((begin, begin_tol, end_tol, end))
+        self._build_index()
+
+    def _build_index(self):
+        super(Partition, self)._build_index()
+        self._params = None
+        params = self._trapezoids
+        if params is None:
+            return
+        begin, begin_tol, end_tol, end = params.T
+        # допускается перекрытие соседних термов на погрешность округления при построении классификатора
+        tol = 1e-9 * (np.abs(params).max() + 1.0) if len(params) else 0.0
+        if np.all(np.diff(begin_tol) > 0) and np.all(end[:-1] <= begin_tol[1:] + tol) and \
+                np.all(begin[1:] >= end_tol[:-1] - tol):
+            self._params = params
+
+    def _kernel(self, flat):
+        """ Возвращает номера (массив формы (n, 2)) и принадлежности двух соседних термов для каждой точки flat.
+
+        Левый терм - последний, интервал толерантности которого начинается левее точки (у четкого классификатора
+        в общей границе соседних термов принадлежности обоих равны 1); номера вне диапазона получают нулевую
+        принадлежность.
+        """
+        params = self._params
+        left = np.searchsorted(params[:, 1], flat, side='left') - 1
+        cols = np.stack((left, left + 1), axis=-1)
+        valid = (cols >= 0) & (cols < len(params))
+        safe = np.clip(cols, 0, len(params) - 1)
+        mu = _trapezoid(flat[:, np.newaxis], params[safe, 0], params[safe, 1], params[safe, 2], params[safe, 3])
+        return cols, np.where(valid, mu, 0.0)
+
+    def fuzzify(self, val):
+        """ Возвращает список пар (номер терма в names, принадлежность) для термов с ненулевой принадлежностью.
+
+        Синтаксис:
+            >>> C = Partition(peaks=[0.0, 0.3, 1.0])
+            >>> [(k, round(mu, 3)) for k, mu in C.fuzzify(0.12)]
+            [(0, 0.6), (1, 0.4)]
+
+        Параметры:
+            val (`float`): элемент области определения классификатора
+        """
+        data, indices, _ = self.fuzzify_batch([val])
+        return zip(indices.tolist(), data.tolist())
+
+    def fuzzify_batch(self, values):
+        """ Фаззифицирует массив значений и возвращает разреженную матрицу принадлежностей в формате CSR.
+
+        Строка i матрицы соответствует i-му значению (массив values предварительно приводится к одномерному),
+        столбец k - терму names[k]; хранятся только ненулевые принадлежности, не более двух в строке, в порядке
+        возрастания номеров термов. Полученная тройка массивов совместима с конструктором
+        ``scipy.sparse.csr_matrix((data, indices, indptr), shape=(len(values), len(names)))``.
+
+        Синтаксис:
+            >>> C = Partition(peaks=[0.0, 0.3, 1.0])
+            >>> data, indices, indptr = C.fuzzify_batch([0.0, 0.12, 0.3])
+            >>> data.round(3).tolist(), indices.tolist(), indptr.tolist()
+            ([1.0, 0.6, 0.4, 1.0], [0, 0, 1, 1], [0, 1, 3, 4])
+
+        Параметры:
+            values (`list` or :class:`numpy.ndarray`): четкие значения
 
+        Возвращает:
+            Кортеж (data, indices, indptr): принадлежности, номера термов и границы строк.
+        """
+        flat = np.asarray(values, dtype=float).ravel()
+        self._ensure_index()
+        if self._params is None:
+            mu = self.memberships(flat)
+            cols = np.broadcast_to(np.arange(len(self.names)), mu.shape)
+        else:
+            cols, mu = self._kernel(flat)
+        keep = mu > 0
+        indptr = np.concatenate(([0], np.cumsum(keep.sum(axis=1))))
+        return mu[keep], cols[keep], indptr
+
+    def memberships(self, values):
+        self._ensure_index()
+        if self._params is None:
+            return super(Partition, self).memberships(values)
+        values = np.asarray(values, dtype=float)
+        cols, mu = self._kernel(values.ravel())
+        res = np.zeros((values.size, len(self.names) + 1))
+        rows = np.arange(values.size)[:, np.newaxis]
+        # номера -1 и len(names) (за крайними термами) указывают на последний, вспомогательный столбец
+        res[rows, cols] = mu
+        return res[:, :-1].reshape(values.shape + (len(self.names),))
+
+    def classify_batch(self, values, index=False):
+        self._ensure_index()
+        if self._params is None:
+            return super(Partition, self).classify_batch(values, index=index)
+        values = np.asarray(values, dtype=float)
+        cols, mu = self._kernel(values.ravel())
+        # при равенстве принадлежностей выбирается левый терм, как и в общем алгоритме
+        right = mu[:, 1] > mu[:, 0]
+        res = np.where(right, cols[:, 1], cols[:, 0])
+        res = np.where(np.where(right, mu[:, 1], mu[:, 0]) > 0, res, -1).reshape(values.shape)
+        if index:
+            return res
+        return self.terms.labels()[res]
+
+    @classmethod
+    def fit(cls, data, terms=3, overlap=None, fuzziness=0.5, k=256, name=''):
+        """ Строит классификатор по выборке данных.
+
+        Данные просматриваются один раз потоковой оценкой квантилей (:class:`QuantileSketch`), поэтому выборка
+        может передаваться итератором порций и не помещаться в память. Область определения - от наименьшего до
+        наибольшего значения, пики термов - квантили уровней i / (terms - 1), так что между соседними пиками
+        находится одинаковая доля данных. Совпадающие квантили (например, у дискретных данных) объединяются,
+        поэтому термов может оказаться меньше, чем запрошено. Если параметр overlap не задан, он подбирается
+        так, чтобы доля значений, лежащих на скатах (с принадлежностью строго между 0 и 1), была равна fuzziness.
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> data = np.random.RandomState(0).exponential(size=100000)
+            >>> A = Partition.fit(np.array_split(data, 10), terms=4)
+            >>> len(A), A.domain.begin == data.min(), A.domain.end == data.max()
+            (4, True, True)
+            >>> A.classify_batch([0.01, 0.4, 1.1, 9.0]).tolist()
+            ['0', '1', '2', '3']
+
+        Параметры:
+            data (:class:`numpy.ndarray` or iterable): массив значений или итератор порций (массивов) значений
+
+        Именованные параметры:
+            terms (`int`): число термов (не меньше 2)
+
+            overlap (`float`): параметр крутизны скатов (см. :class:`Partition`); по умолчанию подбирается
+
+            fuzziness (`float`): доля значений на скатах термов при подборе overlap, 0 <= fuzziness <= 1
+
+            k (`int`): точность оценки квантилей (см. :class:`QuantileSketch`)
+
+            name (`str`): имя классификатора
+
+        Исключения:
+            `ValueError`: если terms < 2, выборка пуста или все ее значения совпадают.
+        """
+        if terms < 2:
+            raise ValueError('terms must be at least 2')
+        sketch = QuantileSketch(k=k)
+        if isinstance(data, np.ndarray):
+            sketch.update(data)
+        else:
+            for chunk in data:
+                sketch.update(chunk)
+        if sketch.min == sketch.max:
+            raise ValueError('data must contain at least two distinct values')
+        peaks = np.unique(sketch.quantile(np.linspace(0.0, 1.0, terms)))
+        if overlap is None:
+            overlap = _fit_overlap(sketch, peaks, fuzziness)
+        return cls(begin=sketch.min, end=sketch.max, peaks=peaks.tolist(), overlap=overlap, name=name)
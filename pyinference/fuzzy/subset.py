@@ -7,7 +7,103 @@ import pyinference.fuzzy.domain
 from pyinference.fuzzy.tnorm import MinMax
 
 import pylab as p
+import bisect
+import functools
 import math
+import numpy as np
+
+
+def _interp(key, x, mu):
+    """ Векторная кусочно-линейная интерполяция по упорядоченным точкам излома (x, mu).
+
+    Вне отрезка [x[0], x[-1]] возвращает 0.0. Вычисления выполняются по той же формуле, что и для отдельной
+    точки в :func:`Subset.value`, поэтому результаты совпадают.
+    """
+    key = np.asarray(key, dtype=float)
+    if len(x) == 1:
+        return np.where(key == x[0], mu[0], 0.0)
+    j = np.clip(np.searchsorted(x, key, side='right'), 1, len(x) - 1)
+    x0, x1, mu0, mu1 = x[j - 1], x[j], mu[j - 1], mu[j]
+    res = (key - x0) * (mu1 - mu0) / (x1 - x0) + mu0
+    res = np.where(key == x1, mu1, res)
+    return np.where((key < x[0]) | (key > x[-1]), 0.0, res)
+
+
+def _trapezoid(key, a, b, c, d):
+    """ Трапециевидная функция принадлежности с параметрами a <= b <= c <= d для числа или массива numpy.
+
+    Вычисляется по тем же формулам, что и интерполяция точек излома (a, 0), (b, 1), (c, 1), (d, 0) в
+    :func:`Subset.value`, поэтому результаты совпадают.
+    """
+    if isinstance(key, np.ndarray):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.select([(key < a) | (key > d), key < b, key <= c],
+                             [0.0, (key - a) * 1.0 / (b - a), 1.0],
+                             (key - c) * -1.0 / (d - c) + 1.0)
+    if key < a or key > d:
+        return 0.0
+    if key < b:
+        return (key - a) * 1.0 / (b - a)
+    if key <= c:
+        return 1.0
+    return (key - c) * -1.0 / (d - c) + 1.0
+
+
+def _rising(x, mu, levels):
+    """ Возвращает абсциссы, в которых неубывающая огибающая mu впервые достигает уровней levels.
+
+    Нулевому уровню соответствует последняя точка, где mu равна нулю (граница носителя). Уровни выше
+    максимума mu вырождаются в последнюю точку.
+    """
+    mu = np.maximum.accumulate(mu)
+    j = np.where(levels > 0, np.searchsorted(mu, levels, side='left'), np.searchsorted(mu, levels, side='right'))
+    j = np.minimum(j, len(mu) - 1)
+    prev = np.maximum(j - 1, 0)
+    dmu = mu[j] - mu[prev]
+    t = np.where(dmu > 0, (levels - mu[prev]) / np.where(dmu > 0, dmu, 1.0), 1.0)
+    return x[prev] + np.clip(t, 0.0, 1.0) * (x[j] - x[prev])
+
+
+def _cuts(x, mu, levels):
+    """ Вычисляет нижние и верхние границы альфа-срезов уровней levels для функции принадлежности,
+    заданной точками (x, mu) и линейной между ними.
+
+    Функция принадлежности считается выпуклой: левее моды берется ее неубывающая огибающая, правее -
+    невозрастающая. Срезы уровней выше высоты подмножества вырождаются в моду.
+    """
+    m = int(np.argmax(mu))
+    lo = _rising(x[:m + 1], mu[:m + 1], levels)
+    hi = -_rising(-x[m:][::-1], mu[m:][::-1], levels)
+    return lo, hi
+
+
+def _memoized(method):
+    """ Кэширует результат функционала подмножества без аргументов (см. :func:`Subset.cache_info`).
+
+    Кэш сбрасывается при изменении точек излома и при замене или изменении области определения подмножества.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self):
+        key = (id(self.domain), getattr(self.domain, '_version', 0))
+        if self._memo is None or self._memo_key != key:
+            self._memo = {}
+            self._memo_key = key
+        if self._memo_stats is None:
+            self._memo_stats = {'hits': 0, 'misses': 0}
+        if name in self._memo:
+            self._memo_stats['hits'] += 1
+            return self._memo[name]
+        self._memo_stats['misses'] += 1
+        res = method(self)
+        # вычисление ленивого выражения сбрасывает кэш, поэтому результат сохраняется после него
+        if self._memo is None:
+            self._memo = {}
+        self._memo[name] = res
+        return res
+
+    return wrapper
 
 
 class Subset(object):
@@ -23,8 +119,28 @@ class Subset(object):
         >>> A.domain.end
         1.0
 
+    Функция принадлежности задается точками излома и линейно интерполируется между ними. Точки излома хранятся
+    в виде двух упорядоченных по абсциссе массивов numpy: абсцисс и соответствующих им значений принадлежности.
+    Поиск отрезка, содержащего точку, выполняется двоичным поиском (модуль :mod:`bisect`), то есть за O(log n).
+    Новые точки, задаваемые через ``A[x] = mu``, накапливаются и добавляются в массивы одним слиянием при
+    следующем обращении к функции принадлежности.
+
+    Для подмножеств на непрерывном носителе (:class:`pyinference.fuzzy.domain.RationalRange`) функционалы
+    card, centr, sup, mode и level вычисляются точно по точкам излома, за O(n) от их числа и независимо от
+    точности носителя. Подклассы, у которых функция принадлежности не кусочно-линейна, сбрасывают атрибут
+    класса ``_piecewise``, и для них функционалы вычисляются по сетке носителя.
+
+    Результаты card, centr, sup и mode кэшируются в экземпляре до изменения точек излома или области
+    определения. Изменения параметров подклассов в обход ``A[x] = mu`` (например, атрибута ``level`` у
+    :class:`Interval`) кэш не отслеживает.
+
+    Атрибуты подмножеств хранятся в ``__slots__``. Параметрические подклассы хранят только свои параметры, а
+    область определения, точки излома и кэш создают при первом обращении (см. :class:`Trapezoidal`). Алгебра
+    операций одна на все подмножества, кроме нечетких чисел (:class:`Number`).
+
     Attributes:
-        values (dict):
+        values (dict): точки излома функции принадлежности (только для чтения; для изменения используйте
+            ``A[x] = mu``)
 
         points (dict):
 
@@ -38,20 +154,161 @@ class Subset(object):
         begin (pyinference.fuzzy.domain.Domain):
     """
 
+    __slots__ = ('_domain', '_points', '_x', '_mu', '_xs', '_mus', '_pending',
+                 '_memo', '_memo_key', '_memo_stats', '_algebra')
+
+    _piecewise = True
+
     def __init__(self, begin=0.0,
                  end=1.0,
                  domain=None):
 
+        self._init_state()
         self.domain = domain or pyinference.fuzzy.domain.RationalRange(begin, end)
-        self.values = {}
         self.points = {}
 
-        self.values[self.domain.begin] = 0.0
-        self.values[self.domain.end] = 0.0
+        self._x = np.empty(0)
+        self._mu = np.empty(0)
+        self._xs = []
+        self._mus = []
+        self[self.domain.begin] = 0.0
+        self[self.domain.end] = 0.0
         self.points[self.domain.begin] = 0.0
         self.points[self.domain.end] = 0.0
 
-        self._algebra = SubsetAlgebra()
+    def _init_state(self):
+        """ Помечает все производное состояние подмножества как еще не созданное.
+        """
+        self._domain = None
+        self._points = None
+        self._x = self._mu = self._xs = self._mus = None
+        self._pending = None
+        self._memo = self._memo_key = self._memo_stats = None
+        self._algebra = _ALGEBRA
+
+    def __getstate__(self):
+        """ Собирает атрибуты из ``__slots__`` всей иерархии классов (и ``__dict__``, если он есть) для pickle.
+
+        Общая алгебра операций не сохраняется и восстанавливается при загрузке.
+        """
+        state = dict(getattr(self, '__dict__', {}))
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+        if state.get('_algebra') is _ALGEBRA:
+            del state['_algebra']
+        return state
+
+    def __setstate__(self, state):
+        self._init_state()
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    @property
+    def domain(self):
+        if self._domain is None:
+            self._domain = self._make_domain()
+        return self._domain
+
+    @domain.setter
+    def domain(self, value):
+        self._domain = value
+
+    @property
+    def points(self):
+        if self._points is None:
+            self._points = {self.domain.begin: 0.0, self.domain.end: 0.0}
+        return self._points
+
+    @points.setter
+    def points(self, value):
+        self._points = value
+
+    def support(self):
+        """ Возвращает границы (begin, end) области определения подмножества.
+
+        Подмножества, заданные параметрами, возвращают границы, не создавая область определения. Для области
+        определения без границ возвращается вся числовая ось.
+        >>> Triangle(1.0, 2.0, 4.0).support()
+        (1.0, 4.0)
+        """
+        domain = self.domain
+        return getattr(domain, 'begin', -np.inf), getattr(domain, 'end', np.inf)
+
+    def _make_domain(self):
+        """ Создает область определения подмножества, заданного параметрами (см. :class:`Trapezoidal`).
+        """
+        raise NotImplementedError
+
+    def _initial_breakpoints(self):
+        """ Возвращает точки излома подмножества, заданного параметрами, до изменений через ``A[x] = mu``.
+        """
+        return [self.domain.begin, self.domain.end], [0.0, 0.0]
+
+    def _merge(self, x, mu):
+        """ Сливает массивы точек излома (x, mu) с уже имеющимися; при совпадении абсцисс побеждают новые значения.
+        """
+        x = np.concatenate((self._x, np.asarray(x, dtype=float)))
+        mu = np.concatenate((self._mu, np.asarray(mu, dtype=float)))
+        # np.unique берет первое вхождение, поэтому массивы обращаются: новые значения оказываются первыми
+        self._x, index = np.unique(x[::-1], return_index=True)
+        self._mu = mu[::-1][index]
+        self._xs = self._x.tolist()
+        self._mus = self._mu.tolist()
+
+    def _breakpoints(self):
+        """ Возвращает упорядоченные массивы абсцисс и значений точек излома функции принадлежности.
+
+        Перед этим накопленные методом __setitem__ точки сливаются с массивами; при совпадении абсцисс
+        новое значение заменяет прежнее. Для поиска отдельных точек хранятся также копии массивов в виде списков.
+        """
+        if self._x is None:
+            self._x = self._mu = np.empty(0)
+            self._merge(*self._initial_breakpoints())
+        if self._pending:
+            pending, self._pending = self._pending, None
+            self._merge(list(pending.keys()), list(pending.values()))
+        return self._x, self._mu
+
+    def _update(self, x, mu):
+        """ Задает значения принадлежности сразу в массиве точек x (аналог ``A[x] = mu`` для массивов numpy).
+
+        Точки должны принадлежать области определения; проверка не выполняется.
+        """
+        self._breakpoints()
+        self._merge(x, mu)
+        self._memo = None
+
+    def _linear(self):
+        """ Возвращает точки излома, ограниченные областью определения, если функционалы можно вычислить по ним
+        точно, иначе None.
+        """
+        domain = self.domain
+        if not self._piecewise or not isinstance(domain, pyinference.fuzzy.domain.RationalRange) or \
+                isinstance(domain, pyinference.fuzzy.domain.IntegerRange) or domain.begin >= domain.end:
+            return None
+        x, mu = self._breakpoints()
+        if x[0] < domain.begin or x[-1] > domain.end:
+            inner = (x > domain.begin) & (x < domain.end)
+            ends = np.array([domain.begin, domain.end])
+            ends_mu = _interp(ends, x, mu)
+            x = np.concatenate((ends[:1], x[inner], ends[1:]))
+            mu = np.concatenate((ends_mu[:1], mu[inner], ends_mu[1:]))
+        if len(x) < 2:
+            return None
+        return x, mu
+
+    def _grid(self):
+        """ Возвращает сетку области определения и значения функции принадлежности в ее точках.
+        """
+        grid = self.domain.as_array()
+        return grid, self.value(grid)
+
+    @property
+    def values(self):
+        x, mu = self._breakpoints()
+        return dict(zip(x.tolist(), mu.tolist()))
 
     def value(self, key):
         """
@@ -67,21 +324,30 @@ class Subset(object):
         1.0
         >>> A.value(0.0)
         0.60653
+
+        Также принимает массив точек (:class:`numpy.ndarray`) и возвращает массив
+        уровней принадлежности той же формы, вычисленный средствами numpy:
+        >>> import numpy as np
+        >>> B = Triangle(0.0, 1.0, 2.0)
+        >>> B.value(np.array([-1.0, 0.25, 1.0, 1.5]))
+        array([0.  , 0.25, 1.  , 0.5 ])
         """
         if isinstance(key, Subset):
             return self.__cmp__(key)
+        if isinstance(key, np.ndarray):
+            x, mu = self._breakpoints()
+            return np.where(self.domain.contains(key), _interp(key, x, mu), 0.0)
 
         if not key in self.domain:
             return 0.0
-        try:
-            return self.values[key]
-        except KeyError:
-            sort = sorted(self.values.keys())
-            sort1 = sorted(self.values.keys())
-            sort1.pop(0)
-            for (i, j) in zip(sort, sort1):
-                if i < key < j:
-                    return (key - i) * (self[j] - self[i]) / (j - i) + self[i]
+        self._breakpoints()
+        x, mu = self._xs, self._mus
+        j = bisect.bisect_right(x, key)
+        if j > 0 and x[j - 1] == key:
+            return mu[j - 1]
+        if j == 0 or j == len(x):
+            return 0.0
+        return (key - x[j - 1]) * (mu[j] - mu[j - 1]) / (x[j] - x[j - 1]) + mu[j - 1]
 
     def char(self):
         """
@@ -127,16 +393,14 @@ class Subset(object):
         if sup == 0.0:
             return self
         res = Subset(self.domain.begin, self.domain.end)
-        for i in self.domain:
-            res[i] = self.value(i) / sup
+        x, mu = self._linear() or self._grid()
+        res._update(x, mu / sup)
         return res
 
+    @_memoized
     def sup(self):
-        sup = 0.0
-        for i in self.domain:
-            if self.value(i) > sup:
-                sup = self.value(i)
-        return sup
+        x, mu = self._linear() or self._grid()
+        return max(float(mu.max()), 0.0)
 
     def plot(self, verbose=True, subplot=p):
         """
@@ -150,12 +414,8 @@ class Subset(object):
             >>> A.plot(verbose=False)
 
         """
-        xxx = []
-        yyy = []
-        for i in self.domain:
-            xxx.append(i)
-            yyy.append(self.value(i))
-        subplot.plot(xxx, yyy)
+        grid, mu = self._grid()
+        subplot.plot(grid, mu)
         if isinstance(self.domain, pyinference.fuzzy.domain.IntegerRange):
             # TODO построение графиков НПМ на целочисленных интервалах.
             pass
@@ -168,27 +428,81 @@ class Subset(object):
                 subplot.text(i, self.points[i], str(i))
 
     def level(self, lvl):
+        """ Возвращает альфа-срез нечеткого подмножества уровня lvl в виде четкого интервала.
+
+        Для кусочно-линейных подмножеств границы среза находятся точно, решением линейного уравнения на отрезках,
+        где функция принадлежности пересекает уровень lvl. Возвращается первая связная компонента среза.
+
+        Синтаксис:
+            >>> A = Triangle(0.0, 1.0, 3.0)
+            >>> B = A.level(0.5)
+            >>> B.begin_tol, B.end_tol
+            (0.5, 2.0)
+        """
+        lin = self._linear()
+        if lin is not None:
+            return self._level_linear(float(lvl), *lin)
         begin = self.domain.begin
         end = self.domain.end
-        for i in self.domain:
-            if self.value(i) >= float(lvl):
-                begin = i
-                break
-        for i in self.domain:
-            if (self.value(i) <= lvl) and (i > begin):
-                end = i
-                break
+        grid, mu = self._grid()
+        above = np.flatnonzero(mu >= float(lvl))
+        if len(above):
+            begin = grid[above[0]].item()
+        below = np.flatnonzero((mu <= lvl) & (grid > begin))
+        if len(below):
+            end = grid[below[0]].item()
         res = Interval(begin, end)
         return res
 
+    def _level_linear(self, lvl, x, mu):
+        above = np.flatnonzero(mu >= lvl)
+        if not len(above):
+            return Interval(self.domain.begin, self.domain.begin)
+        i = above[0]
+        begin = x[i]
+        if i > 0:
+            begin = x[i - 1] + (lvl - mu[i - 1]) * (x[i] - x[i - 1]) / (mu[i] - mu[i - 1])
+        below = np.flatnonzero(mu[i:] < lvl)
+        end = x[-1]
+        if len(below):
+            k = i + below[0]
+            end = x[k - 1] + (mu[k - 1] - lvl) * (x[k] - x[k - 1]) / (mu[k - 1] - mu[k])
+        return Interval(float(begin), float(end))
+
     def __getitem__(self, key):
         return self.value(key)
 
     def __setitem__(self, key, value):
         if not key in self.domain:
             raise KeyError
-        self.values[key] = value
+        if self._pending is None:
+            self._pending = {}
+        self._pending[key] = value
+        self._memo = None
+
+    def cache_info(self):
+        """ Возвращает статистику кэша функционалов подмножества.
+
+        Синтаксис:
+            >>> A = Subset()
+            >>> A[0.5] = 1.0
+            >>> c = A.centr()
+            >>> c = A.centr()
+            >>> A[0.25] = 0.75
+            >>> c = A.centr()
+            >>> info = A.cache_info()
+            >>> info['hits'], info['misses'], info['size']
+            (1, 2, 1)
+
+        Возвращает:
+            Словарь с ключами 'hits' (число попаданий), 'misses' (число промахов) и 'size' (число хранимых
+            значений).
+        """
+        info = dict(self._memo_stats or {'hits': 0, 'misses': 0})
+        info['size'] = len(self._memo or ())
+        return info
 
+    @_memoized
     def centr(self):
         """
         Вычисляет центроид (центр масс) нечеткого подмножества.
@@ -201,16 +515,23 @@ class Subset(object):
         >>> "%0.2f" % A.centr()
         '3.50'
         """
-        sum_ = 0.0
-        j = 0.0
-        for i in self.domain:
-            sum_ += self[i] * i
-            j += self[i]
+        lin = self._linear()
+        if lin is not None:
+            x, mu = lin
+            h = np.diff(x)
+            j = float((h * (mu[:-1] + mu[1:])).sum()) / 2
+            if j != 0:
+                moment = (h * (x[:-1] * (2 * mu[:-1] + mu[1:]) + x[1:] * (mu[:-1] + 2 * mu[1:]))).sum() / 6
+                return float(moment) / j
+            return (self.domain.end - self.domain.begin) / 2
+        grid, mu = self._grid()
+        j = float(mu.sum())
         if j != 0:
-            return sum_ / j
+            return float((mu * grid).sum()) / j
         else:
             return (self.domain.end - self.domain.begin) / 2
 
+    @_memoized
     def card(self):
         """
         Возвращает мощность нечеткого подмножества
@@ -219,11 +540,14 @@ class Subset(object):
             >>> print round(T.card(), 2) # doctest: +SKIP
             4.0
         """
-        sum_ = 0.0
-        for i in self.domain:
-            sum_ += self.value(i)
-        return sum_ * (self.domain.end - self.domain.begin) / self.domain.acc
-
+        lin = self._linear()
+        if lin is not None:
+            x, mu = lin
+            return float((np.diff(x) * (mu[:-1] + mu[1:])).sum()) / 2
+        grid, mu = self._grid()
+        return float(mu.sum()) * (self.domain.end - self.domain.begin) / self.domain.acc
+
+    @_memoized
     def mode(self):
         """ Возвращает моду (точку максимума) нечеткого подмножества.
 
@@ -236,24 +560,21 @@ class Subset(object):
             40.0
             >>> C = A + B
             >>> '%0.3f' % C.mode()
-            '20.040'
+            '20.000'
         """
-        res = self.domain.begin
-        for i in self.domain:
-            if self.value(i) > self.value(res):
-                res = i
-        return res
+        x, mu = self._linear() or self._grid()
+        if mu.max() <= 0:
+            return self.domain.begin
+        return x[np.argmax(mu)].item()
 
     def euclid_distance(self, other):
         begin = min(self.domain.begin, other.domain.begin)
         end = max(self.domain.end, other.domain.end)
         acc = max(self.domain.acc, other.domain.acc)
 
-        domain = pyinference.fuzzy.domain.RationalRange(begin, end, acc=acc)
+        grid = pyinference.fuzzy.domain.RationalRange(begin, end, acc=acc).as_array()
 
-        summ = 0.0
-        for i in domain:
-            summ += (self.value(i) - other.value(i)) ** 2
+        summ = float(((self.value(grid) - other.value(grid)) ** 2).sum())
 
         return math.sqrt(summ / acc)
 
@@ -262,11 +583,9 @@ class Subset(object):
         end = max(self.domain.end, other.domain.end)
         acc = max(self.domain.acc, other.domain.acc)
 
-        domain = pyinference.fuzzy.domain.RationalRange(begin, end, acc=acc)
+        grid = pyinference.fuzzy.domain.RationalRange(begin, end, acc=acc).as_array()
 
-        summ = 0.0
-        for i in domain:
-            summ += abs(self.value(i) - other.value(i))
+        summ = float(np.abs(self.value(grid) - other.value(grid)).sum())
 
         return summ / acc
 
@@ -292,10 +611,7 @@ class Subset(object):
         return self.__neg__()
 
     def __neg__(self):
-        res = Subset(domain=self.domain)
-        for i in res.domain:
-            res[i] = 1 - self.value(i)
-        return res
+        return Expression(lambda mu: 1 - mu, [self], self.domain)
 
     def __and__(self, other):
         return self._algebra.__and__(self, other)
@@ -349,27 +665,48 @@ class Trapezoidal(Subset):
         Attributes:
             begin_tol
             end_tol
+
+    Экземпляр хранит только четыре параметра. Область определения и точки излома создаются при первом
+    обращении к ним; до этого функция принадлежности вычисляется непосредственно по параметрам.
     """
 
+    __slots__ = ('_begin', 'begin_tol', 'end_tol', '_end')
+
     def __init__(self, points):
         (begin, begin_tol, end_tol, end) = points
 
-        super(Trapezoidal, self).__init__(begin, end)
-
-        self.domain.begin = float(begin)
+        self._init_state()
+        self._begin = float(begin)
         self.begin_tol = float(begin_tol)
         self.end_tol = float(end_tol)
-        self.domain.end = float(end)
+        self._end = float(end)
+
+    def _make_domain(self):
+        return pyinference.fuzzy.domain.RationalRange(self._begin, self._end)
+
+    def _initial_breakpoints(self):
+        return [self._begin, self._end, self.begin_tol, self.end_tol], [0.0, 0.0, 1.0, 1.0]
+
+    def _bounds(self):
+        """ Возвращает границы области определения, не создавая ее.
+        """
+        if self._domain is None:
+            return self._begin, self._end
+        return self._domain.begin, self._domain.end
 
-        self[begin] = 0.0
-        self[end] = 0.0
-        self[begin_tol] = 1.0
-        self[end_tol] = 1.0
+    def support(self):
+        return self._bounds()
+
+    def value(self, key):
+        if self._domain is not None or self._x is not None or self._pending or isinstance(key, Subset):
+            return super(Trapezoidal, self).value(key)
+        return _trapezoid(key, self._begin, self.begin_tol, self.end_tol, self._end)
 
     def card(self):
-        return (self.begin_tol - self.domain.begin) / 2 + \
+        begin, end = self._bounds()
+        return (self.begin_tol - begin) / 2 + \
             self.end_tol - self.begin_tol + \
-            (self.domain.end - self.end_tol) / 2
+            (end - self.end_tol) / 2
 
     def mom(self):
         return (self.end_tol + self.begin_tol) / 2
@@ -378,7 +715,8 @@ class Trapezoidal(Subset):
         return self.begin_tol
 
     def median(self):
-        return (self.domain.begin + self.begin_tol + self.domain.end + self.end_tol) / 4
+        begin, end = self._bounds()
+        return (begin + self.begin_tol + end + self.end_tol) / 4
 
     def __eq__(self, other):
         # #        if isinstance(other, Trapezoidal):
@@ -414,6 +752,8 @@ class Triangle(Trapezoidal):
 
     """
 
+    __slots__ = ()
+
     def __init__(self, a, b, c):
         super(Triangle, self).__init__((a, b, b, c))
 
@@ -421,7 +761,8 @@ class Triangle(Trapezoidal):
         return self.begin_tol
 
     def card(self):
-        return (self.domain.end - self.domain.begin) / 2
+        begin, end = self._bounds()
+        return (end - begin) / 2
 
 
 class Interval(Trapezoidal):
@@ -433,6 +774,10 @@ class Interval(Trapezoidal):
 
     """
 
+    __slots__ = ('level',)
+
+    _piecewise = False
+
     def __init__(self, a, b, x=1.0):
         super(Interval, self).__init__((a, a, b, b))
         self.level = x
@@ -441,7 +786,10 @@ class Interval(Trapezoidal):
         return self.end_tol - self.begin_tol
 
     def value(self, value):
-        if value in self.domain:
+        begin, end = self._bounds()
+        if isinstance(value, np.ndarray):
+            return np.where((value >= begin) & (value <= end), float(self.level), 0.0)
+        if begin <= value <= end:
             return self.level
         else:
             return 0.0
@@ -455,20 +803,28 @@ class Point(Trapezoidal):
 
     """
 
+    __slots__ = ()
+
+    _piecewise = False
+
     def __init__(self, a):
         super(Point, self).__init__((a, a, a, a))
 
     def value(self, x):
-        if x != self.domain.begin:
+        a = self._bounds()[0]
+        if isinstance(x, np.ndarray):
+            return np.where(x == a, 1.0, 0.0)
+        if x != a:
             return 0.0
-        elif self.domain.begin == x:
+        elif a == x:
             return 1.0
         else:
             return -1
 
     def plot(self, verbose=True, subplot=p):
-        subplot.scatter([self.domain.begin], [1.0])
-        subplot.plot(self.domain.begin, 1.0)
+        a = self._bounds()[0]
+        subplot.scatter([a], [1.0])
+        subplot.plot(a, 1.0)
 
     def card(self):
         return 0.0
@@ -486,22 +842,31 @@ class Gaussian(Subset):
         omega
     """
 
-    def __init__(self, mu, omega):
-        super(Gaussian, self).__init__(mu - 5 * omega, mu + 5 * omega)
+    __slots__ = ('median', 'omega')
+
+    _piecewise = False
 
+    def __init__(self, mu, omega):
+        self._init_state()
         self.median = float(mu)
         self.omega = float(omega)
 
+    def _make_domain(self):
+        return pyinference.fuzzy.domain.RationalRange(self.median - 5 * self.omega, self.median + 5 * self.omega)
+
+    def support(self):
+        if self._domain is None:
+            return self.median - 5 * self.omega, self.median + 5 * self.omega
+        return super(Gaussian, self).support()
+
     def value(self, x):
+        if isinstance(x, np.ndarray):
+            return np.round(np.exp(-((x - self.median) ** 2) / (2 * self.omega ** 2)), 5)
         return round(math.exp(-((x - self.median) ** 2) / (2 * self.omega ** 2)), 5)
 
     def plot(self, verbose=True, subplot=p):
-        xxx = []
-        yyy = []
-        for i in self.domain:
-            xxx.append(i)
-            yyy.append(self.value(i))
-        subplot.plot(xxx, yyy)
+        grid, mu = self._grid()
+        subplot.plot(grid, mu)
         subplot.plot(self.domain.end + (self.domain.end - self.domain.begin) / 3, -0.1)
         subplot.text(self.median, 1.00, str(self.median))
 
@@ -515,6 +880,240 @@ class Gaussian(Subset):
         return round(math.sqrt(2 * math.pi) * self.omega, 5)
 
 
+class Expression(Subset):
+    """ Нечеткое подмножество, заданное выражением над другими подмножествами.
+
+    Создается операциями алгебры подмножеств (см. :class:`SubsetAlgebra`) и отрицанием. При создании выражение
+    не вычисляется: операторы строят ациклический граф, узлами которого являются выражения, а листьями - исходные
+    подмножества и числа. При первом обращении к функции принадлежности или функционалу весь граф вычисляется
+    за один векторный проход по сетке носителя корневого выражения, без создания промежуточных подмножеств.
+    Полученные значения становятся точками излома, после чего выражение ведет себя как обычное подмножество.
+
+    Так как вычисление откладывается, изменения операндов, сделанные до первого обращения к выражению,
+    учитываются в результате.
+
+    Синтаксис:
+        >>> A = Triangle(0.0, 0.5, 1.0)
+        >>> B = Triangle(0.5, 1.0, 1.5)
+        >>> C = (A | B) & ~A * 0.5
+        >>> isinstance(C, Expression)
+        True
+        >>> '%0.3f' % C.value(0.75)
+        '0.250'
+
+    Args:
+        operation: функция, вычисляющая значения принадлежности узла по массивам значений операндов
+        operands (list): операнды - подмножества или числа
+        domain (pyinference.fuzzy.domain.Domain): область определения результата
+    """
+
+    def __init__(self, operation, operands, domain):
+        self._operation = None
+        super(Expression, self).__init__(domain=domain)
+        self._operation = operation
+        self._operands = operands
+
+    def _compute(self, grid):
+        """ Вычисляет значения выражения в точках grid обходом графа в обратном порядке.
+
+        Общие подвыражения вычисляются один раз; вне своей области определения подвыражение равно 0.
+        """
+        memo = {}
+        stack = [self]
+        while stack:
+            node = stack[-1]
+            lazy = [o for o in node._operands
+                    if isinstance(o, Expression) and o._operation is not None and id(o) not in memo]
+            if lazy:
+                stack.extend(lazy)
+                continue
+            stack.pop()
+            if id(node) in memo:
+                continue
+            values = []
+            for operand in node._operands:
+                if isinstance(operand, Expression) and id(operand) in memo:
+                    values.append(np.where(operand.domain.contains(grid), memo[id(operand)], 0.0))
+                elif isinstance(operand, Subset):
+                    values.append(operand.value(grid))
+                else:
+                    values.append(operand)
+            memo[id(node)] = node._operation(*values)
+        return memo[id(self)]
+
+    def _evaluate(self):
+        if self._operation is not None:
+            grid = self.domain.as_array()
+            mu = self._compute(grid)
+            self._operation = self._operands = None
+            self._update(grid, mu)
+
+    def _breakpoints(self):
+        self._evaluate()
+        return super(Expression, self)._breakpoints()
+
+    def __setitem__(self, key, value):
+        self._evaluate()
+        super(Expression, self).__setitem__(key, value)
+
+
+class Number(Subset):
+    """ Нечеткое число, заданное альфа-срезами.
+
+    Хранит упорядоченный по возрастанию массив уровней и для каждого уровня - границы срезов [lo, hi].
+    Функция принадлежности получается линейной интерполяцией между срезами, поэтому все функционалы
+    :class:`Subset` вычисляются точно. Арифметические операции над нечеткими числами выполняются алгеброй
+    :class:`NumbersAlgebra` интервальной арифметикой над срезами, за O(число уровней).
+
+    Синтаксис:
+        >>> algebra = NumbersAlgebra(levels=5)
+        >>> A = algebra.number(Triangle(1.0, 2.0, 3.0))
+        >>> A.lo.tolist(), A.hi.tolist()
+        ([1.0, 1.25, 1.5, 1.75, 2.0], [3.0, 2.75, 2.5, 2.25, 2.0])
+        >>> A.value(1.5)
+        0.5
+
+    Args:
+        levels (numpy.ndarray): уровни срезов от 0 до 1
+        lo (numpy.ndarray): нижние границы срезов
+        hi (numpy.ndarray): верхние границы срезов
+
+    Kwargs:
+        algebra (NumbersAlgebra): алгебра, выполняющая операции над числом
+    """
+
+    def __init__(self, levels, lo, hi, algebra=None):
+        self.levels = np.asarray(levels, dtype=float)
+        self.lo = np.asarray(lo, dtype=float)
+        self.hi = np.asarray(hi, dtype=float)
+        super(Number, self).__init__(domain=pyinference.fuzzy.domain.RationalRange(self.lo[0], self.hi[0]))
+        # при совпадении абсцисс побеждает последняя точка, поэтому верхние уровни идут после нижних
+        self._update(np.concatenate((self.lo, self.hi)), np.concatenate((self.levels, self.levels)))
+        self._algebra = algebra or NumbersAlgebra(len(self.levels))
+
+    def min(self, other):
+        return self._algebra.min(self, other)
+
+    def max(self, other):
+        return self._algebra.max(self, other)
+
+
+class TrapezoidArray(object):
+    """ Набор трапециевидных нечетких чисел, хранимый в виде одного массива параметров.
+
+    Параметры (a, b, c, d) всех чисел хранятся построчно в массиве numpy формы (n, 4), поэтому функция
+    принадлежности, функционалы и арифметика вычисляются сразу для всех чисел набора. Арифметические операции
+    выполняются поэлементно над альфа-срезами уровней 0 ([a, d]) и 1 ([b, c]); для сложения и вычитания
+    результат точен, для умножения и деления это обычная трапециевидная аппроксимация.
+
+    Синтаксис:
+        >>> A = TrapezoidArray([(0.0, 1.0, 2.0, 4.0), (1.0, 2.0, 2.0, 3.0)])
+        >>> len(A)
+        2
+        >>> A.value(np.array([0.5, 2.5])).tolist()
+        [[0.5, 0.75], [0.0, 0.5]]
+        >>> (A + 1.0).params.tolist()
+        [[1.0, 2.0, 3.0, 5.0], [2.0, 3.0, 3.0, 4.0]]
+        >>> A.tolist()[1].mode()
+        2.0
+
+    Args:
+        params: массив параметров формы (n, 4) или последовательность четверок (a, b, c, d)
+
+    Attributes:
+        params (numpy.ndarray): параметры чисел, по строке на число
+    """
+
+    def __init__(self, params):
+        self.params = np.array(params, dtype=float).reshape((-1, 4))
+
+    @classmethod
+    def from_subsets(cls, subsets):
+        """ Создает набор из последовательности трапециевидных подмножеств (:class:`Trapezoidal` и подклассов).
+        """
+        params = []
+        for subset in subsets:
+            begin, end = subset._bounds()
+            params.append((begin, subset.begin_tol, subset.end_tol, end))
+        return cls(params)
+
+    def tolist(self):
+        """ Возвращает список трапециевидных подмножеств (:class:`Trapezoidal`).
+        """
+        return [Trapezoidal(tuple(row)) for row in self.params.tolist()]
+
+    def __len__(self):
+        return len(self.params)
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TrapezoidArray(self.params[index])
+        return Trapezoidal(tuple(self.params[index].tolist()))
+
+    def value(self, points):
+        """ Возвращает уровни принадлежности точек points всем числам набора.
+
+        Результат имеет форму (n,) + форма points: строка i содержит значения функции принадлежности i-го числа.
+        """
+        points = np.asarray(points, dtype=float)
+        a, b, c, d = [column.reshape((-1,) + (1,) * points.ndim) for column in self.params.T]
+        return _trapezoid(points[np.newaxis], a, b, c, d)
+
+    def card(self):
+        a, b, c, d = self.params.T
+        return (b - a) / 2 + c - b + (d - c) / 2
+
+    def centr(self):
+        a, b, c, d = self.params.T
+        area = c + d - a - b
+        with np.errstate(divide='ignore', invalid='ignore'):
+            res = (c * c + c * d + d * d - a * a - a * b - b * b) / (3 * area)
+        return np.where(area > 0, res, a)
+
+    def mom(self):
+        return (self.params[:, 1] + self.params[:, 2]) / 2
+
+    def mode(self):
+        return self.params[:, 1].copy()
+
+    def median(self):
+        return self.params.sum(axis=1) / 4
+
+    def _cuts(self, other):
+        if isinstance(other, TrapezoidArray):
+            params = other.params
+        else:
+            params = np.full((1, 4), float(other))
+        return params[:, [0, 1]], params[:, [3, 2]]
+
+    def _interval(self, other, operation):
+        a, b = self._cuts(self)
+        c, d = self._cuts(other)
+        lo, hi = operation(a, b, c, d)
+        return TrapezoidArray(np.column_stack((lo[:, 0], lo[:, 1], hi[:, 1], hi[:, 0])))
+
+    def __add__(self, other):
+        return self._interval(other, lambda a, b, c, d: (a + c, b + d))
+
+    def __sub__(self, other):
+        return self._interval(other, lambda a, b, c, d: (a - d, b - c))
+
+    def __mul__(self, other):
+        return self._interval(other, NumbersAlgebra._mul)
+
+    def __div__(self, other):
+        return self._interval(other, NumbersAlgebra._div)
+
+    def min(self, other):
+        return self._interval(other, lambda a, b, c, d: (np.minimum(a, c), np.minimum(b, d)))
+
+    def max(self, other):
+        return self._interval(other, lambda a, b, c, d: (np.maximum(a, c), np.maximum(b, d)))
+
+
 class Algebra():
     def __init__(self):
         pass
@@ -528,15 +1127,9 @@ class SubsetAlgebra(Algebra):
     def _fuzzy_algebra(self, one, other, operation):
         if isinstance(self, Point) or isinstance(other, Point):
             raise NotImplementedError
+        clipped = lambda x, y: np.clip(operation(x, y), 0.0, 1.0)
         if isinstance(other, float) or isinstance(other, int):
-            res = Subset(domain=one.domain)
-            for i in res.domain:
-                res[i] = max(
-                    min(
-                        operation(one[i], other),
-                        1.0),
-                    0.0)
-            return res
+            return Expression(clipped, [one, other], one.domain)
 
         if isinstance(one, Interval) and isinstance(other, float):
             l = max(
@@ -551,14 +1144,7 @@ class SubsetAlgebra(Algebra):
         acc = max(one.domain.acc, other.domain.acc)
 
         domain = pyinference.fuzzy.domain.RationalRange(begin, end, acc=acc)
-        res = Subset(domain=domain)
-        for i in res.domain:
-            res[i] = max(
-                min(
-                    operation(one[i], other[i]),
-                    1.0),
-                0.0)
-        return res
+        return Expression(clipped, [one, other], domain)
 
     def __add__(self, one, other):
         return self._fuzzy_algebra(one, other, lambda x, y: x + y)
@@ -570,10 +1156,10 @@ class SubsetAlgebra(Algebra):
         return self._fuzzy_algebra(one, other, lambda x, y: x * y)
 
     def __and__(self, one, other):
-        return self._fuzzy_algebra(one, other, lambda x, y: self.tnorm.norm(x, y))
+        return self._fuzzy_algebra(one, other, self.tnorm.norm)
 
     def __or__(self, one, other):
-        return self._fuzzy_algebra(one, other, lambda x, y: self.tnorm.conorm(x, y))
+        return self._fuzzy_algebra(one, other, self.tnorm.conorm)
 
     def __div__(self, one, other):
         raise NotImplementedError
@@ -581,12 +1167,8 @@ class SubsetAlgebra(Algebra):
     def __pow__(self, one, other):
         if not (isinstance(other, float) or isinstance(other, int)):
             raise NotImplementedError
-        begin = one.domain.begin
-        end = one.domain.end
-        res = Subset(begin, end)
-        for i in res.domain:
-            res[i] = min(one.value(i) ** other, 1)
-        return res
+        domain = pyinference.fuzzy.domain.RationalRange(one.domain.begin, one.domain.end)
+        return Expression(lambda mu: np.minimum(mu ** other, 1), [one], domain)
 
     # #    def __cmp__(self, one, other):
     # #        raise NotImplementedError
@@ -602,8 +1184,138 @@ class SubsetAlgebra(Algebra):
         return 1 - (self == other)
 
 
-class NumbersAlgebra(Algebra):
-    pass
+_ALGEBRA = SubsetAlgebra()
+
+
+class NumbersAlgebra(SubsetAlgebra):
+    """ Алгебра нечетких чисел.
+
+    Сложение, вычитание, умножение, деление, а также минимум и максимум выполняются над представлением
+    операндов в виде альфа-срезов на фиксированном наборе уровней: к границам срезов всех уровней сразу
+    применяется интервальная арифметика. Результат - :class:`Number` с той же алгеброй, поэтому цепочки
+    вычислений не требуют повторной дискретизации. Произвольные подмножества переводятся в срезы один раз,
+    в предположении, что их функция принадлежности выпукла. Логические операции и возведение в степень
+    наследуются от :class:`SubsetAlgebra`.
+
+    Синтаксис:
+        >>> algebra = NumbersAlgebra(levels=5)
+        >>> A = algebra.number(Triangle(1.0, 2.0, 3.0))
+        >>> B = Triangle(2.0, 3.0, 5.0)
+        >>> C = A + B
+        >>> C.lo.tolist(), C.hi.tolist()
+        ([3.0, 3.5, 4.0, 4.5, 5.0], [8.0, 7.25, 6.5, 5.75, 5.0])
+        >>> (A - B).mode()
+        -1.0
+
+    Kwargs:
+        levels (int): число уровней срезов, равномерно распределенных на отрезке [0, 1]
+        tnorm (pyinference.fuzzy.tnorm.Tnorm): треугольная норма для логических операций
+    """
+
+    def __init__(self, levels=21, tnorm=None):
+        SubsetAlgebra.__init__(self, tnorm)
+        self.levels = np.linspace(0.0, 1.0, levels)
+
+    def number(self, one):
+        """ Возвращает представление подмножества или числа one в виде нечеткого числа этой алгебры.
+        """
+        lo, hi = self._cut(one)
+        return Number(self.levels, lo, hi, algebra=self)
+
+    def _cut(self, one):
+        if isinstance(one, float) or isinstance(one, int):
+            cut = np.full(len(self.levels), float(one))
+            return cut, cut
+        if isinstance(one, Number) and np.array_equal(one.levels, self.levels):
+            return one.lo, one.hi
+        x, mu = one._linear() or one._grid()
+        return _cuts(np.asarray(x, dtype=float), mu, self.levels)
+
+    def _interval(self, one, other, operation):
+        a, b = self._cut(one)
+        c, d = self._cut(other)
+        lo, hi = operation(a, b, c, d)
+        return Number(self.levels, lo, hi, algebra=self)
+
+    def __add__(self, one, other):
+        return self._interval(one, other, lambda a, b, c, d: (a + c, b + d))
+
+    def __sub__(self, one, other):
+        return self._interval(one, other, lambda a, b, c, d: (a - d, b - c))
+
+    @staticmethod
+    def _mul(a, b, c, d):
+        products = np.array([a * c, a * d, b * c, b * d])
+        return products.min(axis=0), products.max(axis=0)
+
+    @staticmethod
+    def _div(a, b, c, d):
+        if np.any((c <= 0) & (d >= 0)):
+            raise ZeroDivisionError
+        return NumbersAlgebra._mul(a, b, 1 / d, 1 / c)
+
+    def __mul__(self, one, other):
+        return self._interval(one, other, self._mul)
+
+    def __div__(self, one, other):
+        return self._interval(one, other, self._div)
+
+    def min(self, one, other):
+        return self._interval(one, other, lambda a, b, c, d: (np.minimum(a, c), np.minimum(b, d)))
+
+    def max(self, one, other):
+        return self._interval(one, other, lambda a, b, c, d: (np.maximum(a, c), np.maximum(b, d)))
+
+    def extend(self, function, inputs, monotone=False, samples=11):
+        """ Вычисляет значение функции от нечетких чисел по принципу обобщения.
+
+        Срез результата на каждом уровне - отрезок [min f, max f] по параллелепипеду, образованному срезами
+        входов того же уровня. Функция должна принимать массивы numpy и вычисляться поэлементно; она вызывается
+        один раз сразу для всех уровней. Для функций, монотонных по каждому аргументу, экстремумы ищутся в
+        вершинах параллелепипеда (2^n точек на уровень), иначе - на равномерной сетке из samples точек по каждому
+        аргументу (samples^n точек на уровень). Приближенные сеточные срезы дополнительно согласуются так, чтобы
+        срезы верхних уровней оставались вложенными в срезы нижних.
+
+        Синтаксис:
+            >>> algebra = NumbersAlgebra(levels=3)
+            >>> A = Triangle(-1.0, 0.0, 1.0)
+            >>> C = algebra.extend(lambda x: x ** 2, [A])
+            >>> C.lo.tolist(), C.hi.tolist()
+            ([0.0, 0.0, 0.0], [1.0, 0.25, 0.0])
+            >>> D = algebra.extend(lambda x, y: x + 2 * y, [A, 1.0], monotone=True)
+            >>> D.lo.tolist(), D.hi.tolist()
+            ([1.0, 1.5, 2.0], [3.0, 2.5, 2.0])
+
+        Args:
+            function: векторизованная функция n аргументов
+            inputs (list): аргументы функции - подмножества или числа
+
+        Kwargs:
+            monotone (bool): функция монотонна по каждому аргументу
+            samples (int): число точек сетки по каждому аргументу для немонотонных функций
+
+        Возвращает:
+            Нечеткое число (:class:`Number`) на уровнях этой алгебры.
+        """
+        cuts = [self._cut(one) for one in inputs]
+        n = len(cuts)
+        if monotone:
+            # вершина параллелепипеда кодируется битами номера: i-й бит выбирает верхнюю границу i-го входа
+            corners = np.arange(2 ** n)[:, None]
+            args = [np.where((corners >> i) & 1, hi, lo) for i, (lo, hi) in enumerate(cuts)]
+        else:
+            t = np.linspace(0.0, 1.0, samples)
+            args = []
+            for i, (lo, hi) in enumerate(cuts):
+                shape = [1] * n + [1]
+                shape[i] = samples
+                args.append(lo + t.reshape(shape) * (hi - lo))
+        values = np.broadcast_to(function(*args), np.broadcast(*args).shape).reshape((-1, len(self.levels)))
+        lo, hi = values.min(axis=0), values.max(axis=0)
+        if not monotone:
+            lo = np.minimum.accumulate(lo[::-1])[::-1]
+            hi = np.maximum.accumulate(hi[::-1])[::-1]
+        return Number(self.levels, lo, hi, algebra=self)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,24 @@
 # -*- coding: UTF-8 -*-
 
 """Модуль реализует набор простых и параметрических треугольных норм и конорм.
+
+Нормы и конормы принимают как числа, так и массивы numpy (с транслированием форм) и вычисляются поэлементно.
+Особые случаи (например, деление на ноль в :class:`Tnorm3`) обрабатываются масками по элементам. Для
+объединения сразу многих значений (например, посылок правил) служат методы :func:`Tnorm.reduce` и
+:func:`Tnorm.reduce_conorm`.
 """
 
-import math
+import functools
+
+import numpy as np
+
+
+def _scalar(res):
+    """ Возвращает скаляр вместо массива нулевой размерности, чтобы норма от чисел оставалась числом.
+    """
+    if isinstance(res, np.ndarray) and res.ndim == 0:
+        return res[()]
+    return res
 
 
 class Tnorm(object):
@@ -13,13 +28,40 @@ class Tnorm(object):
     def conorm(self, i, j):
         pass
 
+    def _reduce(self, operation, array, axis, identity):
+        array = np.moveaxis(np.asarray(array, dtype=float), axis, 0)
+        if not len(array):
+            return _scalar(np.full(array.shape[1:], identity))
+        return _scalar(np.asarray(functools.reduce(operation, array)))
+
+    def reduce(self, array, axis=0):
+        """ Объединяет нормой все значения массива вдоль оси axis (n-арная норма).
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> SumProd().reduce(np.array([[0.5, 1.0], [0.5, 0.2]]), axis=1).tolist()
+            [0.5, 0.1]
+        """
+        return self._reduce(self.norm, array, axis, 1.0)
+
+    def reduce_conorm(self, array, axis=0):
+        """ Объединяет конормой все значения массива вдоль оси axis (n-арная конорма).
+        """
+        return self._reduce(self.conorm, array, axis, 0.0)
+
 
 class MinMax(Tnorm):
     def norm(self, i, j):
-        return min(i, j)
+        return np.minimum(i, j)
 
     def conorm(self, i, j):
-        return max(i, j)
+        return np.maximum(i, j)
+
+    def reduce(self, array, axis=0):
+        return _scalar(np.asarray(array, dtype=float).min(axis=axis, initial=1.0))
+
+    def reduce_conorm(self, array, axis=0):
+        return _scalar(np.asarray(array, dtype=float).max(axis=axis, initial=0.0))
 
 
 class SumProd(Tnorm):
@@ -29,31 +71,24 @@ class SumProd(Tnorm):
     def conorm(self, i, j):
         return i + j - i * j
 
+    def reduce(self, array, axis=0):
+        return _scalar(np.asarray(array, dtype=float).prod(axis=axis))
+
 
 class Margin(Tnorm):
     def norm(self, i, j):
-        return max(i + j - 1, 0)
+        return np.maximum(i + j - 1, 0)
 
     def conorm(self, i, j):
-        return min(i + j, 1)
+        return np.minimum(i + j, 1)
 
 
 class Drastic(Tnorm):
     def norm(self, i, j):
-        if i == 1:
-            return j
-        elif j == 1:
-            return i
-        else:
-            return 0
+        return _scalar(np.where(np.equal(i, 1), j, np.where(np.equal(j, 1), i, 0)))
 
     def conorm(self, i, j):
-        if i == 0:
-            return j
-        elif j == 0:
-            return i
-        else:
-            return 1
+        return _scalar(np.where(np.equal(i, 0), j, np.where(np.equal(j, 0), i, 1)))
 
 
 class ParametricNorm(Tnorm):
@@ -77,10 +112,11 @@ class Tnorm2(ParametricNorm):
         super(Tnorm2, self).__init__(param)
 
     def norm(self, i, j):
-        return i * j / max(i, j, self.param)
+        return i * j / np.maximum(np.maximum(i, j), self.param)
 
     def conorm(self, i, j):
-        return (i + j - i * j - min(i, j, 1 - self.param)) / max(1 - i, 1 - j, self.param)
+        return (i + j - i * j - np.minimum(np.minimum(i, j), 1 - self.param)) / \
+            np.maximum(np.maximum(1 - i, 1 - j), self.param)
 
 
 class Tnorm3(ParametricNorm):
@@ -88,15 +124,28 @@ class Tnorm3(ParametricNorm):
         super(Tnorm3, self).__init__(param)
 
     def norm(self, i, j):
-        try:
-            return 1 / (1 + ((1 / i - 1) ** self.param +
-                             (1 / j - 1) ** self.param) ** (1 / self.param))
-        except ZeroDivisionError:
-            return 0.0
+        i = np.asarray(i, dtype=float)
+        j = np.asarray(j, dtype=float)
+        # при нулевом аргументе прежняя формула делила на ноль; значение нормы в этом случае - 0
+        zero = (i == 0) | (j == 0)
+        i = np.where(zero, 1.0, i)
+        j = np.where(zero, 1.0, j)
+        res = 1 / (1 + ((1 / i - 1) ** self.param +
+                        (1 / j - 1) ** self.param) ** (1.0 / self.param))
+        return _scalar(np.where(zero, 0.0, res))
 
     def conorm(self, i, j):
-        return 1 / (1 + ((1 / i - 1) ** -self.param +
-                         (1 / i - 1) ** -self.param) ** (1 / self.param))
+        i = np.asarray(i, dtype=float)
+        j = np.asarray(j, dtype=float)
+        # при аргументах 0 и 1 формула делит на ноль; конорма в этих случаях - S(1, x) = 1 и S(0, x) = x
+        one = (i == 1) | (j == 1)
+        edge = one | (i == 0) | (j == 0)
+        x = np.where(edge, 0.5, i)
+        y = np.where(edge, 0.5, j)
+        res = 1 / (1 + ((1 / x - 1) ** -self.param +
+                        (1 / y - 1) ** -self.param) ** (-1.0 / self.param))
+        res = np.where(i == 0, j, np.where(j == 0, i, res))
+        return _scalar(np.where(one, 1.0, res))
 
 
 class Tnorm4(ParametricNorm):
@@ -117,11 +166,11 @@ class Tnorm5(ParametricNorm):
         super(Tnorm5, self).__init__(param)
 
     def norm(self, i, j):
-        return max((1 - ((1 - i) ** self.param + (1 - j) ** self.param) **
-                    (1 / self.param)), 0)
+        return np.maximum((1 - ((1 - i) ** self.param + (1 - j) ** self.param) **
+                           (1 / self.param)), 0)
 
     def conorm(self, i, j):
-        return min((i ** self.param + j ** self.param), 1)
+        return np.minimum((i ** self.param + j ** self.param), 1)
 
 
 class Tnorm6(ParametricNorm):
@@ -129,15 +178,18 @@ class Tnorm6(ParametricNorm):
         super(Tnorm6, self).__init__(param)
 
     def norm(self, i, j):
-        try:
-            return math.log((1 + (self.param ** i - 1) * (self.param ** j - 1) /
-                             (self.param - 1)), self.param)
-        except ZeroDivisionError:
-            return 0.0
+        # при param = 1 прежняя формула делила на ноль; значение нормы в этом случае - 0
+        if self.param == 1:
+            return _scalar(np.zeros(np.broadcast(i, j).shape))
+        return np.log((1 + (self.param ** np.asarray(i, dtype=float) - 1) * (self.param ** j - 1) /
+                       (self.param - 1))) / np.log(self.param)
 
     def conorm(self, i, j):
-        return 1 - math.log((1 + (self.param ** (1 - i) + self.param ** (1 - j)) /
-                             (self.param - 1)), self.param)
+        # двойственная к норме конорма, S(i, j) = 1 - T(1 - i, 1 - j); при param = 1 - единица
+        if self.param == 1:
+            return _scalar(np.ones(np.broadcast(i, j).shape))
+        return 1 - np.log((1 + (self.param ** (1 - np.asarray(i, dtype=float)) - 1) *
+                           (self.param ** (1 - j) - 1) / (self.param - 1))) / np.log(self.param)
 
 
 class Tnorm7(ParametricNorm):
@@ -145,10 +197,97 @@ class Tnorm7(ParametricNorm):
         super(Tnorm7, self).__init__(param)
 
     def norm(self, i, j):
-        return max((i + j - 1 + self.param * i * j) / (1 + self.param), 0)
+        return np.maximum((i + j - 1 + self.param * i * j) / (1 + self.param), 0)
+
+    def conorm(self, i, j):
+        return np.minimum((i + j - 1 + self.param * i * j), 1)
+
+
+class LookupNorm(Tnorm):
+    """ Норма, вычисляемая по заранее построенной таблице значений.
+
+    При создании значения нормы и конормы tnorm вычисляются на квадратной сетке size x size равномерно
+    распределенных уровней принадлежности от 0 до 1. Далее норма вычисляется обращением к таблице: по ближайшему
+    узлу сетки (целочисленной индексацией) либо билинейной интерполяцией между четырьмя соседними узлами. Это
+    заменяет степени, логарифмы и деления параметрических норм (:class:`Tnorm3` - :class:`Tnorm7`) несколькими
+    обращениями к массиву. Аргументы вне отрезка [0, 1] приводятся к его границам.
+
+    Оценка погрешности. Пусть h = 1 / (size - 1) - шаг сетки, а норма удовлетворяет условию Липшица с константой L
+    по каждому аргументу (для :class:`MinMax`, :class:`SumProd` и :class:`Margin` L = 1). Тогда погрешность по
+    ближайшему узлу не превышает L * h, а погрешность билинейной интерполяции - 2 * L * h; для дважды гладких норм
+    она не превышает h^2 / 8 * (max|d2T/dx2| + max|d2T/dy2|), а для :class:`SumProd` интерполяция точна. В узлах
+    сетки (в том числе в точках 0 и 1) значения совпадают с точными. Для разрывной :class:`Drastic` оценка не
+    действует. Фактическую погрешность для конкретной нормы возвращает метод :func:`error`.
+
+    Так как нормы вычисляются векторно (см. модуль), на больших массивах таблица по ближайшему узлу заметно
+    быстрее только для норм со степенями и логарифмами (:class:`Tnorm6`, :class:`Tnorm3`), а билинейная
+    интерполяция медленнее точных норм; сравнение выполняет ``benchmarks/bench_tnorm.py``.
+
+    Синтаксис:
+        >>> lut = LookupNorm(SumProd(), size=256, interpolate=True)
+        >>> '%0.4f' % lut.norm(0.3, 0.7)
+        '0.2100'
+        >>> lut.error() < 1e-12
+        True
+
+    Args:
+        tnorm (Tnorm): вычисляемая норма
+
+    Kwargs:
+        size (int): число узлов сетки по каждому аргументу (например, 256 или 1024)
+        interpolate (bool): использовать билинейную интерполяцию вместо ближайшего узла
+    """
+
+    def __init__(self, tnorm, size=256, interpolate=False):
+        if size < 2:
+            raise ValueError('size must be at least 2')
+        self.tnorm = tnorm
+        self.size = size
+        self.interpolate = interpolate
+        grid = np.linspace(0.0, 1.0, size)
+        shape = (size, size)
+        # таблицы хранятся плоскими: узел (i, j) имеет индекс i * size + j
+        self._norm = np.broadcast_to(tnorm.norm(grid[:, None], grid), shape).astype(float).ravel()
+        self._conorm = np.broadcast_to(tnorm.conorm(grid[:, None], grid), shape).astype(float).ravel()
+
+    def _lookup(self, table, i, j):
+        last = self.size - 1
+        pos_i = np.clip(i, 0.0, 1.0) * last
+        pos_j = np.clip(j, 0.0, 1.0) * last
+        if not self.interpolate:
+            # позиции неотрицательны, поэтому округление до ближайшего узла - отбрасывание дробной части от x + 0.5
+            index = (pos_i + 0.5).astype(np.intp) * self.size + (pos_j + 0.5).astype(np.intp)
+            return _scalar(table.take(index))
+        i0 = np.minimum(pos_i.astype(np.intp), last - 1)
+        j0 = np.minimum(pos_j.astype(np.intp), last - 1)
+        di = pos_i - i0
+        dj = pos_j - j0
+        index = i0 * self.size + j0
+        low = table.take(index)
+        low = low + dj * (table.take(index + 1) - low)
+        high = table.take(index + self.size)
+        high = high + dj * (table.take(index + self.size + 1) - high)
+        return _scalar(low + di * (high - low))
+
+    def norm(self, i, j):
+        return self._lookup(self._norm, i, j)
 
     def conorm(self, i, j):
-        return min((i + j - 1 + self.param * i * j), 1)
+        return self._lookup(self._conorm, i, j)
+
+    def error(self):
+        """ Возвращает наибольшее отклонение табличных нормы и конормы от точных в серединах ячеек сетки.
+
+        Для ближайшего узла и для билинейной интерполяции середины ячеек - наиболее удаленные от узлов точки.
+        """
+        grid = np.linspace(0.0, 1.0, self.size)
+        middle = (grid[:-1] + grid[1:]) / 2
+        points = np.sort(np.concatenate((grid, middle)))
+        i, j = points[:, None], points
+        with np.errstate(invalid='ignore'):
+            errors = [np.abs(self.norm(i, j) - self.tnorm.norm(i, j)),
+                      np.abs(self.conorm(i, j) - self.tnorm.conorm(i, j))]
+        return float(max(np.nanmax(error) for error in errors))
 
 
 if __name__ == "__main__":
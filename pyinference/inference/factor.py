@@ -1,6 +1,6 @@
 # coding=utf-8
 
-from numpy import repeat, ones, array
+from numpy import ones, zeros, array, divide, take
 from pyinference.inference.variable import Variable
 
 __author__ = 'sejros'
@@ -111,6 +111,9 @@ class Factor(object):
             Соответствует форме массива `cpd`.
 
         cpd (:class:`numpy.array`): массив, хранящий распределение условной вероятности фактора.
+            Каждое присваивание этому атрибуту увеличивает счетчик версий фактора, по которому сеть
+            (:class:`pyinference.inference.net.Net`) определяет устаревание своих кэшей. Изменение элементов
+            массива "на месте" (``f.cpd[0] = 0.5``) счетчик не меняет.
 
     Именованные параметры:
         name (`str`): имя фактора
@@ -132,19 +135,26 @@ class Factor(object):
         self.vars = self.cond + self.cons
         self.shape = tuple([var.card for var in self.vars])
 
+        self._version = 0
         self.cpd = ones(self.shape)
         self._normalize()
 
+    @property
+    def cpd(self):
+        """ Массив распределения условной вероятности фактора.
+        """
+        return self._cpd
+
+    @cpd.setter
+    def cpd(self, value):
+        self._cpd = value
+        self._version += 1
+
     def _normalize(self):
         n, m = len(self.cons), len(self.cond)
-        s = self.cpd.sum(axis=tuple(range(m, n + m))).flatten()
-        koef = array(self.shape)[m:].prod()
-        if isinstance(s, float):
-            s = array([s])
-        s = repeat(s, koef)
+        s = self.cpd.sum(axis=tuple(range(m, n + m)), keepdims=True)
         s[s == 0.0] = 1.0
-        self.cpd = self.cpd.flatten() / s
-        self.cpd = self.cpd.reshape(self.shape)
+        self.cpd = self.cpd / s
 
     def _map(self, other):
         res = []
@@ -155,6 +165,20 @@ class Factor(object):
                     break
         return res
 
+    def _align(self, other):
+        """ Приводит массив распределения фактора other к осям данного фактора.
+
+        Оси массива other.cpd переставляются в порядке следования соответствующих переменных в данном факторе,
+        а на месте переменных, отсутствующих в other, вставляются оси единичной длины. Полученный массив
+        участвует в поэлементных операциях с массивами формы `shape` по правилам broadcasting библиотеки numpy.
+        """
+        axes = self._map(other)
+        order = sorted(range(len(axes)), key=lambda k: axes[k])
+        shape = [1] * len(self.vars)
+        for k in order:
+            shape[axes[k]] = other.cpd.shape[k]
+        return other.cpd.transpose(order).reshape(shape)
+
     def marginal(self, var):
         """ Выполняет маргинализацию переменной из фактора.
 
@@ -164,6 +188,7 @@ class Factor(object):
         - F(A,B,C) - B = F(A,C)
         - F(A,C|B) - B = F(A,C)
         - F(A,B|C) - B = F(A|C)
+        - F(A|B) - A = F(B)
 
         Может вызываться как метод (``m = f1.marginal(var)``) или как оператор "-" (``m = f1 - var``).
 
@@ -202,10 +227,61 @@ class Factor(object):
         cons2 = {var}
         cond = cond1 - cons2
         cons = cons1 - cons2
+        if not cons:
+            # F(A|B) - A = F(B)
+            cons, cond = cond, set()
         res = Factor(name="Marginal", cons=sorted(list(cons)), cond=sorted(list(cond)))
         res.cpd = self.cpd.sum(axis=ind)
         return res
 
+    def reduce(self, var, index):
+        """ Выполняет редукцию фактора по наблюдаемому значению переменной.
+
+        Редукция оставляет в факторе только назначения, в которых переменная var принимает значение с номером
+        index, и исключает эту переменную из области определения фактора:
+
+        - F(A,B,C), B=b -> F(A,C)
+        - F(A,B|C), B=b -> F(A|C)
+        - F(A|B), A=a -> F(B)
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> c = Variable(name='C', terms=['no', 'yes'])
+            >>> t = Variable(name='T', terms=['pos', 'neg'])
+            >>> T = Factor(name='T|C', cons=[t], cond=[c])
+            >>> T.cpd = np.array([[0.2, 0.8], [0.9, 0.1]])
+            >>> r = T.reduce(t, t.index('pos'))
+            >>> [var.name for var in r.vars]
+            ['C']
+            >>> "%0.1f" % r.cpd[1]
+            '0.9'
+
+        Параметры:
+            var (:class:`Variable`): наблюдаемая переменная;
+
+            index (`int`): номер наблюдаемого значения в терм-множестве переменной (см. :func:`Variable.index`).
+
+        Возвращает:
+            Редуцированный фактор
+
+        Исключения:
+            `AttributeError`: ошибка возникает, когда переменная не входит в фактор или является его единственной
+            переменной.
+        """
+        ind = -1
+        for i in xrange(len(self.vars)):
+            if var.name == self.vars[i].name:
+                ind = i
+        if ind == -1:
+            raise AttributeError
+        cond = [v for v in self.cond if v.name != var.name]
+        cons = [v for v in self.cons if v.name != var.name]
+        if not cons:
+            cons, cond = cond, []
+        res = Factor(name="Reduced", cons=cons, cond=cond)
+        res.cpd = take(self.cpd, index, axis=ind)
+        return res
+
     def product(self, other):
         """ Реализует произведение факторов.
 
@@ -259,21 +335,10 @@ class Factor(object):
         cond = everything - cons
         res = Factor(name="Product", cons=list(cons), cond=list(cond))
 
-        flat = res.cpd.flatten()
-        ass = _itershape(res.shape)
-        map1 = res._map(self)
-        map2 = res._map(other)
-
-        for i in range(len(flat)):
-            ass1, ass2 = [], []
-            for j in map1:
-                ass1.append(ass[i][j])
-            for j in map2:
-                ass2.append(ass[i][j])
-            cpd1 = self.cpd[tuple(ass1)]
-            cpd2 = other.cpd[tuple(ass2)]
-            flat[i] = cpd1 * cpd2
-        res.cpd = flat.reshape(res.shape)
+        cpd = res._align(self) * res._align(other)
+        if cpd.shape != res.shape:
+            cpd = cpd * ones(res.shape)
+        res.cpd = cpd
         return res
 
     def divide(self, other):
@@ -302,6 +367,9 @@ class Factor(object):
         Параметры:
             other (:class:`Factor`): фактор-делитель.
 
+        Назначения, для которых значение делителя равно нулю, получают нулевое значение (в том числе в случае
+        неопределенности 0/0), поэтому результат никогда не содержит NaN.
+
         Возвращает:
             Фактор-частное двух исходных
 
@@ -328,21 +396,9 @@ class Factor(object):
         cons = cons1 - cons2
         res = Factor(name="Conditional", cons=sorted(list(cons)), cond=sorted(list(cond)))
 
-        flat = res.cpd.flatten()
-        ass = _itershape(res.shape)
-        map1 = res._map(self)
-        map2 = res._map(other)
-
-        for i in range(len(flat)):
-            ass1, ass2 = [], []
-            for j in map1:
-                ass1.append(ass[i][j])
-            for j in map2:
-                ass2.append(ass[i][j])
-            cpd1 = self.cpd[tuple(ass1)]
-            cpd2 = other.cpd[tuple(ass2)]
-            flat[i] = cpd1 / cpd2
-        res.cpd = flat.reshape(res.shape)
+        divisor = res._align(other)
+        res.cpd = zeros(res.shape)
+        divide(res._align(self), divisor, out=res.cpd, where=(divisor != 0.0))
         res._normalize()
         return res
 
@@ -1,8 +1,178 @@
 # coding=utf-8
 
+from collections import OrderedDict
+
+from numpy import ones, arange, asarray, einsum, rollaxis, take, broadcast_to
+from pyinference.inference.factor import Factor
+
 __author__ = 'sejros'
 
 
+def _reduce(factor, observed):
+    """ Редуцирует фактор по всем входящим в него наблюдаемым переменным.
+
+    Параметры:
+        factor (:class:`Factor`): редуцируемый фактор;
+
+        observed (`dict`): словарь, сопоставляющий имени наблюдаемой переменной номер ее значения.
+
+    Возвращает:
+        Редуцированный фактор или None, если все переменные фактора наблюдаемы (фактор вырождается в константу).
+    """
+    for var in factor.vars:
+        if var.name in observed:
+            if len(factor.vars) == 1:
+                return None
+            factor = factor.reduce(var, observed[var.name])
+    return factor
+
+
+def _interaction_graph(factors):
+    """ Строит граф взаимодействия переменных набора факторов.
+
+    Две переменные смежны, если входят в один фактор. Для факторов условной вероятности сети этот граф совпадает
+    с моральным графом сети.
+
+    Возвращает:
+        Кортеж из графа (словарь, сопоставляющий имени переменной множество имен смежных с ней переменных) и
+        словаря, сопоставляющего имени переменной ее объект (:class:`Variable`).
+    """
+    graph = {}
+    variables = {}
+    for factor in factors:
+        for var in factor.vars:
+            variables[var.name] = var
+            graph.setdefault(var.name, set()).update(v.name for v in factor.vars if v.name != var.name)
+    return graph, variables
+
+
+def _elimination_order(factors, hidden):
+    """ Строит порядок исключения скрытых переменных по эвристике min-fill.
+
+    Порядок строится жадно на графе взаимодействия переменных (две переменные смежны, если входят в один фактор):
+    на каждом шаге исключается переменная, исключение которой добавляет в граф меньше всего новых ребер.
+    При равенстве числа ребер выбирается переменная с наименьшим весом - произведением мощностей ее и ее соседей,
+    то есть с наименьшим размером промежуточного фактора.
+
+    Параметры:
+        factors (`list`): список факторов (:class:`Factor`);
+
+        hidden (`list`): список исключаемых переменных (:class:`Variable`).
+
+    Возвращает:
+        Список переменных из hidden в порядке их исключения.
+    """
+    graph, variables = _interaction_graph(factors)
+    card = dict((name, var.card) for name, var in variables.items())
+    remaining = dict((var.name, var) for var in hidden)
+    order = []
+    while remaining:
+        best, best_cost = None, None
+        for name in sorted(remaining):
+            neighbours = graph.get(name, set())
+            fill = 0
+            for a in neighbours:
+                fill += len(neighbours - graph[a] - {a})
+            weight = card.get(name, 1)
+            for a in neighbours:
+                weight *= card[a]
+            cost = (fill // 2, weight)
+            if best_cost is None or cost < best_cost:
+                best, best_cost = name, cost
+        neighbours = graph.pop(best, set())
+        for a in neighbours:
+            graph[a] |= neighbours - {a}
+            graph[a].discard(best)
+        order.append(remaining.pop(best))
+    return order
+
+
+def _eliminate(factors, hidden):
+    """ Исключает скрытые переменные из набора факторов (алгоритм variable elimination).
+
+    Для каждой переменной в порядке, заданном :func:`_elimination_order`, перемножаются только факторы,
+    содержащие эту переменную, после чего она сразу маргинализуется из произведения. Факторы, не зависящие ни от
+    одной переменной (константы), отбрасываются, так как не влияют на нормированный результат.
+
+    Параметры:
+        factors (`list`): список факторов (:class:`Factor`);
+
+        hidden (`list`): список исключаемых переменных (:class:`Variable`).
+
+    Возвращает:
+        Фактор - произведение оставшихся факторов, определенный на всех неисключенных переменных.
+    """
+    factors = list(factors)
+    for var in _elimination_order(factors, hidden):
+        related = [f for f in factors if var.name in [v.name for v in f.vars]]
+        if not related:
+            continue
+        factors = [f for f in factors if f not in related]
+        prod = None
+        for factor in related:
+            prod *= factor
+        if len(prod.vars) > 1:
+            factors.append(prod - [v for v in prod.vars if v.name == var.name][0])
+    res = None
+    for factor in factors:
+        res *= factor
+    return res
+
+
+class _BatchFactor(object):
+    """ Фактор пакетного запроса (см. :func:`Net.query_batch`).
+
+    В отличие от :class:`Factor`, массив распределения такого фактора может иметь ведущую ось пакета записей:
+    i-й срез вдоль этой оси соответствует i-й записи наблюдений.
+
+    Поля класса:
+        vars (`list`): список переменных фактора (не включая ось пакета);
+
+        cpd (:class:`numpy.array`): массив значений фактора;
+
+        batched (`bool`): имеет ли массив ведущую ось пакета.
+    """
+
+    def __init__(self, vars, cpd, batched=False):
+        self.vars = list(vars)
+        self.cpd = cpd
+        self.batched = batched
+
+    def reduce(self, var, indices):
+        """ Редуцирует фактор по наблюдаемой переменной, номера значений которой заданы для каждой записи пакета.
+        """
+        names = [v.name for v in self.vars]
+        axis = names.index(var.name)
+        if self.batched:
+            cpd = rollaxis(self.cpd, axis + 1, 1)[arange(len(indices)), indices]
+        else:
+            cpd = rollaxis(take(self.cpd, indices, axis=axis), axis, 0)
+        return _BatchFactor(self.vars[:axis] + self.vars[axis + 1:], cpd, True)
+
+
+def _contract(factors, keep):
+    """ Перемножает пакетные факторы и суммирует по всем переменным, кроме keep, одним вызовом numpy.einsum.
+
+    Параметры:
+        factors (`list`): список факторов (:class:`_BatchFactor`);
+
+        keep (`list`): список сохраняемых переменных (:class:`Variable`).
+
+    Возвращает:
+        Фактор (:class:`_BatchFactor`) на переменных keep (в том же порядке). Ось пакета сохраняется, если она
+        есть хотя бы у одного из сомножителей.
+    """
+    labels = {}
+    args = []
+    for factor in factors:
+        args.append(factor.cpd)
+        args.append(([0] if factor.batched else []) +
+                    [labels.setdefault(var.name, len(labels) + 1) for var in factor.vars])
+    batched = any(factor.batched for factor in factors)
+    args.append(([0] if batched else []) + [labels[var.name] for var in keep])
+    return _BatchFactor(keep, einsum(*args), batched)
+
+
 class _Node(object):
     def __init__(self):
         self.parents = []
@@ -14,6 +184,186 @@ class _Node(object):
         return self.name
 
 
+def _triangulate(factors):
+    """ Триангулирует граф взаимодействия переменных и возвращает его максимальные клики.
+
+    Клики получаются исключением всех переменных в порядке :func:`_elimination_order`: каждая исключаемая
+    переменная вместе со своими соседями образует клику, а добавленные при исключении ребра триангулируют граф.
+
+    Возвращает:
+        Список клик, каждая из которых - список переменных (:class:`Variable`).
+    """
+    graph, variables = _interaction_graph(factors)
+    cliques = []
+    for var in _elimination_order(factors, variables.values()):
+        neighbours = graph.pop(var.name)
+        for a in neighbours:
+            graph[a] |= neighbours - {a}
+            graph[a].discard(var.name)
+        clique = neighbours | {var.name}
+        if not any(clique <= other for other in cliques):
+            cliques.append(clique)
+    return [[variables[name] for name in sorted(clique)] for clique in cliques]
+
+
+class _CliqueTree(object):
+    """ Откалиброванное дерево клик (junction tree) набора факторов.
+
+    Клики триангулированного морального графа связываются в дерево (лес для несвязной сети) по максимальному
+    остовному дереву, вес ребра которого равен мощности разделяющего множества. Каждый фактор сети приписывается
+    первой клике, содержащей все его переменные. Калибровка выполняется алгоритмом sum-product в два прохода:
+    сбор сообщений к корню и их распространение обратно. После калибровки фактор каждой клики (атрибут `beliefs`)
+    пропорционален совместному распределению ее переменных.
+
+    Поля класса:
+        factors (`list`): факторы, по которым построено дерево;
+
+        cliques (`list`): клики - списки переменных (:class:`Variable`);
+
+        beliefs (`list`): откалиброванные факторы клик, в порядке атрибута `cliques`.
+    """
+
+    def __init__(self, factors):
+        self.factors = list(factors)
+        self._versions = [factor._version for factor in self.factors]
+        self.cliques = _triangulate(self.factors)
+        names = [set(var.name for var in clique) for clique in self.cliques]
+
+        potentials = []
+        for clique in self.cliques:
+            potential = Factor(name='Clique', cons=clique)
+            potential.cpd = ones(potential.shape)
+            potentials.append(potential)
+        for factor in self.factors:
+            scope = set(var.name for var in factor.vars)
+            for i in range(len(self.cliques)):
+                if scope <= names[i]:
+                    potentials[i] *= factor
+                    break
+
+        # максимальный остовный лес по мощности разделяющих множеств (алгоритм Краскала)
+        edges = []
+        for i in range(len(self.cliques)):
+            for j in range(i + 1, len(self.cliques)):
+                if names[i] & names[j]:
+                    edges.append((-len(names[i] & names[j]), i, j))
+        component = range(len(self.cliques))
+        tree = dict((i, []) for i in range(len(self.cliques)))
+        for _, i, j in sorted(edges):
+            ci, cj = component[i], component[j]
+            if ci != cj:
+                component = [ci if c == cj else c for c in component]
+                tree[i].append(j)
+                tree[j].append(i)
+
+        # порядок обхода: ребра (родитель, потомок) от корней каждой компоненты
+        edges = []
+        visited = set()
+        for root in range(len(self.cliques)):
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [root]
+            while stack:
+                i = stack.pop()
+                for j in tree[i]:
+                    if j not in visited:
+                        visited.add(j)
+                        edges.append((i, j))
+                        stack.append(j)
+
+        messages = {}
+
+        def send(i, j):
+            res = potentials[i]
+            for k in tree[i]:
+                if k != j:
+                    res = res * messages[(k, i)]
+            messages[(i, j)] = res - [var for var in res.vars if var.name not in names[j]]
+
+        for i, j in reversed(edges):
+            send(j, i)
+        for i, j in edges:
+            send(i, j)
+
+        self.beliefs = []
+        for i in range(len(self.cliques)):
+            belief = potentials[i]
+            for k in tree[i]:
+                belief = belief * messages[(k, i)]
+            self.beliefs.append(belief)
+
+    def valid(self, factors):
+        """ Проверяет, что дерево построено по данным факторам и их распределения с тех пор не переназначались.
+        """
+        return len(factors) == len(self.factors) and \
+            all(a is b for a, b in zip(factors, self.factors)) and \
+            self._versions == [factor._version for factor in self.factors]
+
+    def marginal(self, names):
+        """ Возвращает ненормированное распределение переменных с именами names.
+
+        Распределение берется из наименьшей откалиброванной клики, содержащей все переменные, с маргинализацией
+        остальных ее переменных. Если такой клики нет, возвращает None.
+        """
+        names = set(names)
+        candidates = [belief for belief in self.beliefs if names <= set(var.name for var in belief.vars)]
+        if not candidates:
+            return None
+        belief = min(candidates, key=lambda f: f.cpd.size)
+        return belief - [var for var in belief.vars if var.name not in names]
+
+
+class _QueryCache(object):
+    """ Ограниченный кэш результатов запросов с вытеснением давно не использованных записей (LRU).
+
+    Кэш хранит сигнатуру сети - идентификаторы и версии ее факторов (см. атрибут `cpd` класса :class:`Factor`)
+    на момент заполнения. Если при обращении сигнатура изменилась, кэш очищается.
+
+    Поля класса:
+        maxsize (`int`): максимальное число хранимых результатов;
+
+        hits (`int`): число попаданий;
+
+        misses (`int`): число промахов;
+
+        evictions (`int`): число вытесненных записей.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._signature = None
+
+    def clear(self):
+        self._data.clear()
+
+    def get(self, key, signature):
+        if signature != self._signature:
+            self._data.clear()
+            self._signature = signature
+        if key in self._data:
+            self.hits += 1
+            res = self._data.pop(key)
+            self._data[key] = res
+            return res
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'size': len(self._data), 'maxsize': self.maxsize}
+
+
 class Net(object):
     """ Данный класс реализует смешанную сеть вывода.
 
@@ -80,11 +430,16 @@ class Net(object):
             Поэтому при использовании конструктора может генерироваться исключение метода :func:`add_node`.
             В частности, такое может произойти при неверном порядке факторов в передаваемом списке. Поэтому,
             рекомендуется использовать конструктор без второго параметра, а факторы в сеть добавлять явно.
+
+        cache (`int`): максимальное число результатов запросов, хранимых в кэше сети (см. :func:`query`).
+            По умолчанию (cache = 0) кэширование отключено.
     """
 
-    def __init__(self, name='', nodes=None):
+    def __init__(self, name='', nodes=None, cache=0):
         self.name = name
         self.nodes = []
+        self._tree = None
+        self._cache = _QueryCache(cache) if cache else None
         for node in (nodes or []):
             self.add_node(node)
 
@@ -175,6 +530,72 @@ class Net(object):
             uncond = uncond - parent.uncond.cons
         node.uncond = uncond
         self.nodes.append(node)
+        self._tree = None
+        if self._cache is not None:
+            self._cache.clear()
+
+    def cache_info(self):
+        """ Возвращает статистику кэша запросов сети.
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> from pyinference.inference.variable import Variable
+            >>> from pyinference.inference.factor import Factor
+            >>> c = Variable(name='C', terms=['no', 'yes'])
+            >>> t = Variable(name='T', terms=['pos', 'neg'])
+            >>> c_node = Factor(name='C', cons=[c])
+            >>> t_node = Factor(name='T|C', cons=[t], cond=[c])
+            >>> bn = Net(name='Cancer', nodes=[c_node, t_node], cache=16)
+            >>> q = bn.query(query=[c], evidence={t: 'pos'})
+            >>> q = bn.query(query=[c], evidence={t: 'pos'})
+            >>> info = bn.cache_info()
+            >>> info['hits'], info['misses'], info['size']
+            (1, 1, 1)
+
+        Возвращает:
+            Словарь с ключами 'hits' (число попаданий), 'misses' (число промахов), 'evictions' (число вытесненных
+            результатов), 'size' (число хранимых результатов) и 'maxsize' (емкость кэша), или None, если
+            кэширование отключено.
+        """
+        if self._cache is None:
+            return None
+        return self._cache.info()
+
+    def compile(self):
+        """ Компилирует сеть в откалиброванное дерево клик (junction tree).
+
+        Моральный граф сети триангулируется, его максимальные клики связываются в дерево, которое однократно
+        калибруется передачей сообщений sum-product. После компиляции запросы (:func:`query`), все переменные
+        которых (и запроса, и наблюдений) входят в одну клику, - в частности, любые запросы по одной переменной -
+        вычисляются маргинализацией фактора этой клики, без повторного исключения переменных. Остальные запросы
+        вычисляются, как и прежде, исключением переменных.
+
+        Скомпилированное дерево используется до тех пор, пока не изменится состав сети или не будет переназначен
+        атрибут `cpd` одного из ее факторов; после этого дерево перестраивается автоматически при следующем запросе.
+        Добавление фактора (:func:`add_node`) сбрасывает компиляцию.
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> from pyinference.inference.variable import Variable
+            >>> from pyinference.inference.factor import Factor
+            >>> c = Variable(name='C', terms=['no', 'yes'])
+            >>> t = Variable(name='T', terms=['pos', 'neg'])
+            >>> c_node = Factor(name='C', cons=[c])
+            >>> c_node.cpd = np.array([0.99, 0.01])
+            >>> t_node = Factor(name='T|C', cons=[t], cond=[c])
+            >>> t_node.cpd = np.array([[0.2, 0.8], [0.9, 0.1]])
+            >>> bn = Net(name='Cancer', nodes=[c_node, t_node])
+            >>> bn.compile()
+
+            >>> q = bn.query(query=[c], evidence=[t])
+            >>> "%0.3f" % q.cpd[0,0]
+            '0.957'
+            >>> c_node.cpd = np.array([0.5, 0.5])
+            >>> q = bn.query(query=[c], evidence=[t])
+            >>> "%0.3f" % q.cpd[0,0]
+            '0.182'
+        """
+        self._tree = _CliqueTree([node.conditional for node in self.nodes])
 
     def query(self, query=None, evidence=None):
         """ Выполняет запрос к сети вывода.
@@ -203,26 +624,167 @@ class Net(object):
             >>> "%0.3f" % q.cpd[1,1]
             '0.001'
 
+            >>> p = bn.query(query=[c], evidence={t: 'pos'})
+            >>> len(p.vars)
+            1
+            >>> "%0.3f" % p.cpd[0]
+            '0.957'
+
+        Запрос вычисляется методом исключения переменных (variable elimination) без построения распределения
+        совместной вероятности всех переменных сети: скрытые переменные исключаются по одной, причем перемножаются
+        только факторы, содержащие исключаемую переменную. Порядок исключения выбирается эвристикой min-fill.
+        Полученное распределение P(Q,E) нормируется по переменным запроса для каждого назначения наблюдений.
+        Если сеть скомпилирована (:func:`compile`), и все переменные запроса и наблюдений входят в одну клику,
+        распределение P(Q,E) берется из откалиброванного дерева клик.
+
+        Если при создании сети задан кэш (параметр `cache`), результаты запросов сохраняются по именам переменных
+        запроса и наблюдений (и наблюдаемым значениям), и повторный запрос возвращает сохраненный фактор. Кэш
+        очищается при добавлении фактора в сеть и при переназначении атрибута `cpd` любого из ее факторов.
+        Возвращаемые из кэша факторы не следует изменять.
+
         Именованные параметры:
             query (`list`): список переменных (:class:`Variable`) запроса;
 
-            evidence (`list`): список переменных (:class:`Variable`) свидетельств.
+            evidence (`list` or `dict`): список переменных (:class:`Variable`) свидетельств.
+                Также может передаваться словарь наблюдаемых значений, сопоставляющий переменной элемент ее
+                терм-множества (например, ``{t: 'pos'}``). В этом случае все факторы сети до исключения
+                переменных редуцируются по наблюдаемым значениям (см. :func:`Factor.reduce`), и вычисляется
+                только апостериорное распределение переменных запроса.
 
         Возвращает:
             Фактор (:class:`Factor`), представляющий рапределение условной вероятности,
             где условными переменными являются наблюдения (evidence), а подусловными - переменные запроса (query):
-            F(Q|E).
+            F(Q|E). Если наблюдения заданы словарем значений, возвращается фактор F(Q), представляющий
+            апостериорное распределение P(Q|E=e).
+
+        Исключения:
+            `ValueError`: ошибка возникает, когда наблюдаемое значение не входит в терм-множество переменной.
+        """
+        query = query or []
+        evidence = evidence or []
+        if self._cache is None:
+            return self._query(query, evidence)
+        if isinstance(evidence, dict):
+            key = (tuple(var.name for var in query), True,
+                   tuple(sorted((var.name, value) for var, value in evidence.items())))
+        else:
+            key = (tuple(var.name for var in query), False, tuple(var.name for var in evidence))
+        signature = [(id(node.conditional), node.conditional._version) for node in self.nodes]
+        res = self._cache.get(key, signature)
+        if res is None:
+            res = self._query(query, evidence)
+            self._cache.put(key, res)
+        return res
+
+    def query_batch(self, query=None, evidence=None, values=None):
+        """ Выполняет пакетный запрос к сети: один и тот же запрос для множества записей наблюдений.
+
+        Каждая запись - это назначение наблюдаемых переменных, заданное номерами их значений (см.
+        :func:`Variable.index`). Все записи обрабатываются одновременно: факторы сети редуцируются по наблюдениям
+        с сохранением ведущей оси пакета, и эта ось проходит через все шаги исключения переменных, так что на
+        каждом шаге выполняется одна операция numpy над всем пакетом. Если сеть скомпилирована (:func:`compile`),
+        и все переменные запроса и наблюдений входят в одну клику, редуцируется фактор этой клики.
+
+        Синтаксис:
+            >>> import numpy as np
+            >>> from pyinference.inference.variable import Variable
+            >>> from pyinference.inference.factor import Factor
+            >>> c = Variable(name='C', terms=['no', 'yes'])
+            >>> t = Variable(name='T', terms=['pos', 'neg'])
+            >>> c_node = Factor(name='C', cons=[c])
+            >>> c_node.cpd = np.array([0.99, 0.01])
+            >>> t_node = Factor(name='T|C', cons=[t], cond=[c])
+            >>> t_node.cpd = np.array([[0.2, 0.8], [0.9, 0.1]])
+            >>> bn = Net(name='Cancer', nodes=[c_node, t_node])
+
+            >>> p = bn.query_batch(query=[c], evidence=[t], values=np.array([[0], [1], [0]]))
+            >>> p.shape
+            (3, 2)
+            >>> ["%0.3f" % x for x in p[:, 0]]
+            ['0.957', '0.999', '0.957']
+
+        Именованные параметры:
+            query (`list`): список переменных (:class:`Variable`) запроса;
+
+            evidence (`list`): список наблюдаемых переменных (:class:`Variable`) - столбцов массива values;
+
+            values (:class:`numpy.array`): целочисленный массив формы (число записей, число наблюдаемых
+                переменных), j-й столбец которого содержит номера значений j-й наблюдаемой переменной.
+
+        Возвращает:
+            Массив (:class:`numpy.array`) формы (число записей,) + мощности переменных запроса (в порядке списка
+            query), i-й срез которого - апостериорное распределение P(Q|E=e_i) для i-й записи.
         """
         query = query or []
         evidence = evidence or []
-        # TODO локальный вывод
-        res = self.joint()
+        values = asarray(values, dtype=int)
+        if values.ndim == 1:
+            values = values.reshape((-1, 1))
+        observed = dict((var.name, values[:, j]) for j, var in enumerate(evidence))
+        names = set(var.name for var in query) | set(observed)
+
+        factors = [node.conditional for node in self.nodes]
+        joint = None
+        if self._tree is not None:
+            if not self._tree.valid(factors):
+                self.compile()
+            joint = self._tree.marginal(names)
+        if joint is not None:
+            factors = [joint]
+        factors = [_BatchFactor(factor.vars, factor.cpd) for factor in factors]
+        for i in range(len(factors)):
+            for var in list(factors[i].vars):
+                if var.name in observed:
+                    factors[i] = factors[i].reduce(var, observed[var.name])
+
+        hidden = {}
+        for factor in factors:
+            for var in factor.vars:
+                if var.name not in names:
+                    hidden[var.name] = var
+        for var in _elimination_order(factors, hidden.values()):
+            related = [f for f in factors if var.name in [v.name for v in f.vars]]
+            if not related:
+                continue
+            factors = [f for f in factors if f not in related]
+            keep = {}
+            for factor in related:
+                for v in factor.vars:
+                    if v.name != var.name:
+                        keep[v.name] = v
+            factors.append(_contract(related, keep.values()))
+
+        res = _contract(factors, query).cpd
+        if res.ndim == len(query):
+            res = broadcast_to(res, (len(values),) + res.shape)
+        s = res.sum(axis=tuple(range(1, res.ndim)), keepdims=True)
+        s[s == 0.0] = 1.0
+        return res / s
+
+    def _query(self, query, evidence):
+        observed = {}
+        if isinstance(evidence, dict):
+            observed = dict((var.name, var.index(value)) for var, value in evidence.items())
+            evidence = []
         # TODO проверка корректности
-        hidden = list(set(res.vars) - set(query) - set(evidence))
-        for h in hidden:
-            res -= h
-        for e in evidence:
-            for node in self.nodes:
-                if node.uncond.vars == [e]:
-                    res /= node.uncond
+        factors = [node.conditional for node in self.nodes]
+        names = set(var.name for var in query + evidence) | set(observed)
+        joint = None
+        if self._tree is not None:
+            if not self._tree.valid(factors):
+                self.compile()
+            joint = self._tree.marginal(names)
+            if joint is not None:
+                joint = _reduce(joint, observed)
+        if joint is None:
+            factors = [f for f in [_reduce(f, observed) for f in factors] if f is not None]
+            hidden = {}
+            for factor in factors:
+                for var in factor.vars:
+                    if var.name not in names:
+                        hidden[var.name] = var
+            joint = _eliminate(factors, hidden.values())
+        res = Factor(name="Conditional", cons=query, cond=evidence)
+        res.cpd = res._align(joint)
+        res._normalize()
         return res
\ No newline at end of file
@@ -55,7 +55,11 @@ class Variable(object):
 
         name (`str`): имя переменной
 
-        terms (`list`): список значений переменной (терм-множество)
+        terms (:class:`pyinference.fuzzy.set.TermRegistry`): терм-множество переменной - реестр значений с
+            целочисленными кодами. Код значения равен индексу вдоль оси переменной в массивах распределений
+            факторов. Переменная, связанная с классификатором, использует реестр самого классификатора, поэтому
+            коды, возвращаемые :func:`pyinference.fuzzy.set.FuzzySet.classify_batch`, можно непосредственно
+            передавать в качестве наблюдений (см. :func:`pyinference.inference.net.Net.query_batch`).
 
         value (`object`): текущее значение переемнной
 
@@ -75,13 +79,15 @@ class Variable(object):
             self.terms = terms
             self.classifier = {}
         elif isinstance(terms, fuzzy_set.FuzzySet):
-            self.terms = terms.sets
+            self.terms = terms.terms
             self.classifier = terms
         elif isinstance(terms, dict):
             self.terms = terms.keys()
             self.classifier = terms
         else:
             raise TypeError
+        if not isinstance(self.terms, fuzzy_set.TermRegistry):
+            self.terms = fuzzy_set.TermRegistry(self.terms)
         self.card = len(self.terms)
         self.value = None
         self.name = name
@@ -135,6 +141,48 @@ class Variable(object):
             val2 = value
         return float(val1 == val2)
 
+    def index(self, value):
+        """ Возвращает номер значения в терм-множестве переменной.
+
+        Номер значения соответствует индексу вдоль оси этой переменной в массивах распределений факторов.
+
+        Синтаксис:
+            >>> import pyinference.inference.variable
+            >>> a = Variable(name='a', terms=['low', 'high'])
+            >>> a.index('high')
+            1
+
+        Параметры:
+            value (`object`): элемент терм-множества переменной.
+
+        Возвращает:
+            Целое число - номер значения в атрибуте `terms`.
+
+        Исключения:
+            `ValueError`: если значение не входит в терм-множество переменной.
+        """
+        return self.terms.code(value)
+
+    def codes(self, values):
+        """ Векторный аналог :func:`index`: возвращает массив номеров значений той же формы, что и values.
+
+        Синтаксис:
+            >>> from pyinference.fuzzy import set as fuzzy_set
+            >>> fs = fuzzy_set.Partition(peaks=[0.0, 0.5, 1.0])
+            >>> b = Variable(name='B', terms=fs)
+            >>> b.codes(['2', '0', '2']).tolist()
+            [2, 0, 2]
+            >>> fs.classify_batch([0.9, 0.1], index=True).tolist()
+            [2, 0]
+
+        Параметры:
+            values (`list` or :class:`numpy.ndarray`): элементы терм-множества переменной.
+
+        Исключения:
+            `ValueError`: если какое-либо значение не входит в терм-множество переменной.
+        """
+        return self.terms.codes(values)
+
     def __repr__(self):
         """ Краткое текстовое представление перееменной.
 
@@ -46,7 +46,7 @@ setup(
     ],
 
     install_requires=[
-        'numpy>=1.6.1',
+        'numpy>=1.15.0',
         'matplotlib>=1.4.0',
     ]
 )
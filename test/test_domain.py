@@ -3,6 +3,7 @@
 
 import unittest
 import sys
+import numpy as np
 
 sys.path.append("..\\")
 import pyinference.fuzzy.domain
@@ -62,6 +63,26 @@ class TestRationalRange(unittest.TestCase):
         self.assertIn(-0.92, dom)
         self.assertNotIn(153.0, dom)
 
+    def test_contains_array(self):
+        dom = pyinference.fuzzy.domain.RationalRange(-0.92, 152.6, 258)
+        items = np.array([-1.0, -0.92, 0.7, 152.6, 153.0])
+        self.assertListEqual([x in dom for x in items], dom.contains(items).tolist())
+
+    def test_as_array_endpoint(self):
+        dom = pyinference.fuzzy.domain.RationalRange(0.1, 0.7, 3)
+        arr = dom.as_array()
+        self.assertEqual(4, len(arr))
+        self.assertEqual(0.7, arr[-1])
+        self.assertListEqual(arr.tolist(), [x for x in dom])
+
+    def test_as_array_cache(self):
+        dom = pyinference.fuzzy.domain.RationalRange(0, 1, 10)
+        self.assertIs(dom.as_array(), dom.as_array())
+        dom.acc = 20
+        self.assertEqual(21, len(dom.as_array()))
+        dom.end = 2.0
+        self.assertEqual(2.0, dom.as_array()[-1])
+
 
 class TestIntegerRange(unittest.TestCase):
 
@@ -111,5 +132,17 @@ class TestIntegerRange(unittest.TestCase):
         self.assertIn(0, dom)
         self.assertNotIn(-0.92, dom)
 
+    def test_contains_array(self):
+        dom = pyinference.fuzzy.domain.IntegerRange(-0.92, 152.6)
+        items = np.array([-1.0, 0.0, 25.0, 25.5, 152.0, 152.6])
+        self.assertListEqual([x in dom for x in items], dom.contains(items).tolist())
+
+    def test_as_array_cache(self):
+        dom = pyinference.fuzzy.domain.IntegerRange(0, 5)
+        self.assertIs(dom.as_array(), dom.as_array())
+        self.assertListEqual([0, 1, 2, 3, 4, 5], dom.as_array().tolist())
+        dom.end = 7
+        self.assertEqual(7, dom.as_array()[-1])
+
 if __name__ == '__main__':
     unittest.main()
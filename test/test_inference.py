@@ -1,10 +1,11 @@
 # coding=utf-8
 
+import itertools
 import unittest
 import numpy as np
 
 from pyinference.inference.factor import Factor
-from pyinference.inference.net import Net
+from pyinference.inference.net import Net, _BatchFactor, _elimination_order
 from pyinference.inference.variable import Variable
 from pyinference.fuzzy.set import Partition
 
@@ -22,6 +23,27 @@ class TestVariable(unittest.TestCase):
         self.assertAlmostEqual(a.equals('low'), 1.0)
         self.assertAlmostEqual(a.equals('high'), 0.0)
 
+    def test_index(self):
+        a = Variable(name='A', terms=['low', 'high'])
+        self.assertEqual(1, a.index('high'))
+        self.assertRaises(ValueError, lambda: a.index('middle'))
+
+    def test_codes(self):
+        a = Variable(name='A', terms=['low', 'middle', 'high'])
+        self.assertEqual(['low', 'middle', 'high'], list(a.terms))
+        self.assertEqual([[2, 0], [1, 1]], a.codes([['high', 'low'], ['middle', 'middle']]).tolist())
+        self.assertRaises(ValueError, lambda: a.codes(['low', 'none']))
+
+    def test_classifier_registry(self):
+        fs = Partition(peaks=[0.0, 0.25, 0.5, 0.75, 1.0])
+        a = Variable(name='A', terms=fs)
+        self.assertIs(fs.terms, a.terms)
+        self.assertEqual(5, a.card)
+        self.assertEqual(['0', '1', '2', '3', '4'], list(a.terms))
+        values = np.array([0.9, 0.1, 0.5, 0.3])
+        self.assertEqual([a.index(name) for name in fs.classify_batch(values)],
+                         fs.classify_batch(values, index=True).tolist())
+
     def test_equals_classifier(self):
         fs = Partition(peaks=[0.0, 0.5, 1.0])
         a = Variable(name='A', terms=fs)
@@ -86,12 +108,47 @@ class TestFactor(unittest.TestCase):
         self.assertAlmostEqual(0.001, p.cpd[1, 1])
         self.assertEqual(2, len(p.vars))
 
+    def test_product_broadcast(self):
+        x = Variable(name='X', terms=[0, 1])
+        y = Variable(name='Y', terms=[0, 1, 2])
+        z = Variable(name='Z', terms=[0, 1, 2, 3])
+        f1 = Factor(name='F(Z|X)', cons=[z], cond=[x])
+        f1.cpd = np.random.rand(*f1.shape)
+        f2 = Factor(name='F(X,Y)', cons=[y, x])
+        f2.cpd = np.random.rand(*f2.shape)
+        p = f1 * f2
+        self.assertEqual(3, len(p.vars))
+        for ass in itertools.product(*[range(v.card) for v in p.vars]):
+            value = dict(zip([v.name for v in p.vars], ass))
+            ass1 = tuple(value[v.name] for v in f1.vars)
+            ass2 = tuple(value[v.name] for v in f2.vars)
+            self.assertAlmostEqual(f1.cpd[ass1] * f2.cpd[ass2], p.cpd[ass])
+
+    def test_reduce(self):
+        r = self.T.reduce(self.t, 1)
+        self.assertEqual(['C'], [v.name for v in r.vars])
+        self.assertAlmostEqual(0.8, r.cpd[0])
+        self.assertAlmostEqual(0.1, r.cpd[1])
+        r = self.T.reduce(self.c, 1)
+        self.assertEqual(['T'], [v.name for v in r.vars])
+        self.assertAlmostEqual(0.9, r.cpd[0])
+        self.assertRaises(AttributeError, lambda: self.C.reduce(self.t, 0))
+
     def test_division(self):
         p = (self.C * self.T) / self.C
         self.assertAlmostEqual(0.2, p.cpd[0, 0])
         self.assertAlmostEqual(0.8, p.cpd[0, 1])
         self.assertEqual(2, len(p.vars))
 
+    def test_division_by_zero(self):
+        self.C.cpd = np.array([1.0, 0.0])
+        p = (self.C * self.T) / self.C
+        self.assertFalse(np.isnan(p.cpd).any())
+        self.assertAlmostEqual(0.2, p.cpd[0, 0])
+        self.assertAlmostEqual(0.8, p.cpd[0, 1])
+        self.assertAlmostEqual(0.0, p.cpd[1, 0])
+        self.assertAlmostEqual(0.0, p.cpd[1, 1])
+
 
 class TestNet(unittest.TestCase):
 
@@ -130,6 +187,140 @@ class TestNet(unittest.TestCase):
         self.assertEqual('0.957', "%0.3f" % q.cpd[0,0])
         self.assertEqual('0.001', "%0.3f" % q.cpd[1,1])
 
+    def _student(self):
+        d = Variable(name='D', terms=['easy', 'hard'])
+        i = Variable(name='I', terms=['low', 'high'])
+        g = Variable(name='G', terms=['A', 'B', 'C'])
+        s = Variable(name='S', terms=['failed', 'passed'])
+        l = Variable(name='L', terms=['denied', 'provided'])
+        factors = [Factor(name='D', cons=[d]),
+                   Factor(name='I', cons=[i]),
+                   Factor(name='G|I,D', cons=[g], cond=[i, d]),
+                   Factor(name='S|I', cons=[s], cond=[i]),
+                   Factor(name='L|G', cons=[l], cond=[g])]
+        for factor in factors:
+            factor.cpd = np.random.rand(*factor.shape)
+            factor._normalize()
+        return Net(name='student', nodes=factors), (d, i, g, s, l)
+
+    def test_query_matches_joint(self):
+        bn, (d, i, g, s, l) = self._student()
+        for query, evidence in [([i], [g, d]), ([i], [d]), ([l], [i]), ([g, s], []), ([d], [s, l])]:
+            q = bn.query(query=query, evidence=evidence)
+            j = bn.joint()
+            for var in list(j.vars):
+                if var not in query + evidence:
+                    j -= var
+            ref = Factor(cons=query, cond=evidence)
+            ref.cpd = ref._align(j)
+            ref._normalize()
+            self.assertListEqual([v.name for v in ref.vars], [v.name for v in q.vars])
+            self.assertTrue(np.allclose(ref.cpd, q.cpd))
+
+    def test_query_observed(self):
+        bn = Net(name='Cancer', nodes=[self.C, self.T])
+        q = bn.query(query=[self.c], evidence={self.t: 'neg'})
+        self.assertTupleEqual((2,), q.shape)
+        self.assertEqual('0.999', "%0.3f" % q.cpd[0])
+        self.assertEqual('0.001', "%0.3f" % q.cpd[1])
+        self.assertRaises(ValueError, lambda: bn.query(query=[self.c], evidence={self.t: 'unknown'}))
+
+    def test_query_observed_matches_table(self):
+        bn, (d, i, g, s, l) = self._student()
+        for compiled in (False, True):
+            if compiled:
+                bn.compile()
+            for query, evidence in [([i], [g, d]), ([l], [i]), ([d], [s, l]), ([g, s], [l])]:
+                table = bn.query(query=query, evidence=evidence)
+                for ass in itertools.product(*[range(v.card) for v in table.cond]):
+                    q = bn.query(query=query, evidence=dict((v, v.terms[k]) for v, k in zip(table.cond, ass)))
+                    row = table.cpd[tuple(ass)]
+                    self.assertListEqual([v.name for v in table.cons], [v.name for v in q.vars])
+                    self.assertTrue(np.allclose(row, q.cpd))
+
+    def test_query_batch(self):
+        bn, (d, i, g, s, l) = self._student()
+        for compiled in (False, True):
+            if compiled:
+                bn.compile()
+            for query, evidence in [([i], [g, d]), ([l], [i]), ([d], [s, l]), ([g, s], [l]), ([g, i], [d])]:
+                values = np.array(list(itertools.product(*[range(v.card) for v in evidence])) * 3)
+                res = bn.query_batch(query=query, evidence=evidence, values=values)
+                self.assertTupleEqual((len(values),) + tuple(v.card for v in query), res.shape)
+                for row, ass in zip(res, values):
+                    q = bn.query(query=query, evidence=dict((v, v.terms[k]) for v, k in zip(evidence, ass)))
+                    self.assertTrue(np.allclose(q._align(_BatchFactor(query, row)), q.cpd))
+
+    def test_query_cache(self):
+        bn = Net(name='Cancer', nodes=[self.C, self.T], cache=2)
+        self.assertIsNone(Net(name='Cancer', nodes=[self.C, self.T]).cache_info())
+        q1 = bn.query(query=[self.c], evidence={self.t: 'pos'})
+        self.assertIs(q1, bn.query(query=[self.c], evidence={self.t: 'pos'}))
+        bn.query(query=[self.c], evidence={self.t: 'neg'})
+        bn.query(query=[self.c], evidence=[self.t])
+        info = bn.cache_info()
+        self.assertEqual(1, info['hits'])
+        self.assertEqual(3, info['misses'])
+        self.assertEqual(1, info['evictions'])
+        self.assertEqual(2, info['size'])
+        self.assertIsNot(q1, bn.query(query=[self.c], evidence={self.t: 'pos'}))
+
+    def test_query_cache_invalidation(self):
+        bn = Net(name='Cancer', nodes=[self.C, self.T], cache=8)
+        q1 = bn.query(query=[self.c], evidence={self.t: 'pos'})
+        self.C.cpd = np.array([0.5, 0.5])
+        q2 = bn.query(query=[self.c], evidence={self.t: 'pos'})
+        self.assertEqual('0.182', "%0.3f" % q2.cpd[0])
+        self.assertEqual(0, bn.cache_info()['hits'])
+        bn.add_node(Factor(name='X', cons=[Variable(name='X', terms=[0, 1])]))
+        self.assertEqual(0, bn.cache_info()['size'])
+
+    def test_query_long_chain(self):
+        chain = [Variable(name='X%d' % k, terms=['low', 'mean', 'high']) for k in range(16)]
+        bn = Net(name='chain', nodes=[Factor(name='X0', cons=[chain[0]])])
+        trans = np.array([[0.8, 0.1, 0.1], [0.2, 0.6, 0.2], [0.1, 0.3, 0.6]])
+        for prev, var in zip(chain, chain[1:]):
+            factor = Factor(name=var.name, cons=[var], cond=[prev])
+            factor.cpd = trans
+            bn.add_node(factor)
+        q = bn.query(query=[chain[-1]], evidence=[chain[0]])
+        self.assertTupleEqual((3, 3), q.shape)
+        self.assertTrue(np.allclose(np.linalg.matrix_power(trans, 15), q.cpd))
+
+    def test_compile(self):
+        bn, (d, i, g, s, l) = self._student()
+        requests = [([i], [g, d]), ([i], [d]), ([l], [i]), ([g, s], []), ([d], [s, l]), ([s], [])]
+        expected = [bn.query(query=query, evidence=evidence) for query, evidence in requests]
+        bn.compile()
+        tree = bn._tree
+        for (query, evidence), ref in zip(requests, expected):
+            q = bn.query(query=query, evidence=evidence)
+            self.assertListEqual([v.name for v in ref.vars], [v.name for v in q.vars])
+            self.assertTrue(np.allclose(ref.cpd, q.cpd))
+        self.assertIs(tree, bn._tree)
+        for belief in tree.beliefs:
+            for var in belief.vars:
+                marginal = belief - [v for v in belief.vars if v is not var]
+                self.assertTrue(np.allclose(bn.query(query=[var]).cpd, marginal.cpd / marginal.cpd.sum()))
+
+    def test_compile_invalidation(self):
+        bn, (d, i, g, s, l) = self._student()
+        bn.compile()
+        tree = bn._tree
+        bn.query(query=[g], evidence=[i])
+        bn.nodes[0].conditional.cpd = np.array([0.1, 0.9])
+        q = bn.query(query=[g], evidence=[i])
+        self.assertIsNot(tree, bn._tree)
+        bn._tree = None
+        self.assertTrue(np.allclose(bn.query(query=[g], evidence=[i]).cpd, q.cpd))
+
+    def test_elimination_order(self):
+        center = Variable(name='center', terms=[0, 1])
+        leaves = [Variable(name='leaf%d' % k, terms=[0, 1]) for k in range(3)]
+        factors = [Factor(cons=[leaf], cond=[center]) for leaf in leaves]
+        order = _elimination_order(factors, [center] + leaves)
+        self.assertNotIn('center', [var.name for var in order[:2]])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -4,8 +4,10 @@
 import unittest
 import ddt
 import sys
+import numpy as np
 
 from pyinference.fuzzy.set import *
+from pyinference.fuzzy.set import _overlap, _params
 from pyinference.fuzzy.subset import Gaussian, Triangle
 
 sys.path.append("..\\")
@@ -41,6 +43,123 @@ class TestFuzzySet(unittest.TestCase):
     def testclassify(self, res, val):
         self.assertEquals(res, self.A.classify(val))
 
+    def testmemberships(self):
+        values = np.array([[0.0, 10.0, 22.0], [40.0, 50.0, 100.0]])
+        mu = self.A.memberships(values)
+        self.assertEqual((2, 3, 2), mu.shape)
+        self.assertEqual(['term1', 'term2'], self.A.names)
+        for index in np.ndindex(values.shape):
+            for k, term in enumerate(self.A.names):
+                self.assertAlmostEqual(self.A.find(values[index], term), mu[index][k])
+
+    def testclassify_batch(self):
+        values = np.array([15, 55, 40, 0])
+        self.assertEqual([self.A.classify(val) for val in values], self.A.classify_batch(values).tolist())
+        self.assertEqual([0, 1, 1, 0], self.A.classify_batch(values, index=True).tolist())
+        self.assertEqual([-1], FuzzySet().classify_batch([0.5], index=True).tolist())
+
+    def testclassify_tie(self):
+        a = FuzzySet(0, 10)
+        for name, peak in (('low', 2), ('mid', 4), ('high', 6), ('x', 8)):
+            a.add_term(Triangle(peak - 2, peak, peak + 2), name=name)
+        values = [5.0, 3.0, 7.0, 6.0]
+        self.assertEqual(['mid', 'low', 'high', 'high'], [a.classify(val) for val in values])
+        self.assertEqual(['mid', 'low', 'high', 'high'], a.classify_batch(values).tolist())
+
+    @ddt.data(Triangle(10, 20, 30), Gaussian(55, 5), Triangle(60, 70, 95))
+    def testclassify_subset(self, val):
+        cards = [(val & self.A[name]).card() for name in self.A.names]
+        self.assertTrue(np.allclose(cards, self.A._overlaps(val), rtol=0.02, atol=0.05))
+        self.assertEqual(self.A.names[int(np.argmax(cards))], self.A.classify(val))
+
+    def testgrid_cache(self):
+        grid, terms = self.A._grid()
+        self.assertIs(terms, self.A._grid()[1])
+        self.A.domain.end = 50.0
+        grid, terms = self.A._grid()
+        self.assertEqual(50.0, grid[-1])
+        self.A.add_term(Triangle(0, 5, 10), name='term3')
+        self.assertEqual((3, len(grid)), self.A._grid()[1].shape)
+
+    def testindex(self):
+        a = FuzzySet(0, 100)
+        for i in xrange(50):
+            a.add_term(Triangle(i * 2.0, i * 2.0 + 3.0, i * 2.0 + 6.0), name=i)
+        a.add_term(Gaussian(50, 1), name='g')
+        values = np.concatenate((np.linspace(-5, 105, 221), [0.0, 3.0, 50.0, 104.0]))
+        for val in values:
+            expected = [k for k, name in enumerate(a.names) if a[name].value(val) > 0]
+            self.assertTrue(set(expected) <= set(a._candidates(val)))
+            self.assertTrue(len(a._candidates(val)) <= 5)
+        brute = np.array([[a[name].value(val) for name in a.names] for val in values])
+        self.assertTrue(np.allclose(brute, a.memberships(values)))
+        self.assertEqual([a.classify(val) for val in values], a.classify_batch(values).tolist())
+        self.assertEqual([], a._candidates(-1.0))
+        self.assertEqual([49], a._candidates(104.0))
+
+    def testindex_lazy(self):
+        a = FuzzySet(0, 300)
+        for i in xrange(300):
+            a.add_term(Gaussian(i, 10.0), name=i)
+        self.assertFalse(a._indexed)
+        self.assertEqual(150, a.classify(150.0))
+        self.assertTrue(a._indexed)
+        # каждый терм хранится в дереве ровно один раз
+        stack, stored = [a._tree], []
+        while stack:
+            node = stack.pop()
+            if node is not None:
+                stored.extend(node[1])
+                stack.extend(node[5:])
+        self.assertEqual(range(300), sorted(stored))
+        for val in np.linspace(-60, 360, 211):
+            expected = [k for k, (begin, end) in enumerate(a._supports) if begin <= val <= end]
+            self.assertEqual(expected, a._candidates(val))
+        a.add_term(Triangle(400, 410, 420), name='far')
+        self.assertFalse(a._indexed)
+        self.assertEqual([300], a._candidates(410.0))
+
+
+class TestTermRegistry(unittest.TestCase):
+    def testcodes(self):
+        r = TermRegistry(['b', 'a'])
+        self.assertEqual(0, r.add('b'))
+        self.assertEqual(2, r.add('c'))
+        self.assertEqual(['b', 'a', 'c'], list(r))
+        self.assertEqual([1, 2, 0], r.codes(np.array(['a', 'c', 'b'])).tolist())
+        self.assertEqual((0,), r.codes([]).shape)
+        self.assertRaises(ValueError, lambda: r.code('d'))
+        self.assertEqual(['b', 'a', 'c', None], r.labels().tolist())
+
+    def testfuzzyset(self):
+        a = FuzzySet(0, 10)
+        a.add_term(Triangle(0, 1, 2), name='z')
+        a.add_term(Triangle(1, 2, 3), name='y')
+        a.add_term(Triangle(1, 5, 9), name='z')
+        self.assertEqual(['z', 'y'], a.names)
+        self.assertEqual([5.0, 2.0], [term.mode() for term in a])
+
+
+class TestQuantileSketch(unittest.TestCase):
+    def testquantile(self):
+        data = np.random.RandomState(1).normal(size=200000)
+        sketch = QuantileSketch(k=128)
+        for chunk in np.array_split(data, 50):
+            sketch.update(chunk)
+        levels = np.linspace(0.0, 1.0, 21)
+        ranks = np.searchsorted(np.sort(data), sketch.quantile(levels)) / float(len(data))
+        self.assertTrue(np.allclose(levels, ranks, atol=0.02))
+        self.assertTrue(np.allclose(levels[1:-1], sketch.cdf(np.percentile(data, levels[1:-1] * 100)), atol=0.02))
+        self.assertEqual((data.min(), data.max()), (sketch.quantile(0.0), sketch.quantile(1.0)))
+        self.assertTrue(sum(len(level) for level in sketch._levels) <= 128 * len(sketch._levels))
+
+    def testupdate(self):
+        sketch = QuantileSketch(k=4).update([3.0, np.nan, 1.0]).update(2.0)
+        self.assertEqual(3, sketch.count)
+        self.assertEqual(2.0, sketch.quantile(0.5))
+        self.assertRaises(ValueError, lambda: QuantileSketch().quantile(0.5))
+        self.assertRaises(ValueError, lambda: QuantileSketch(k=1))
+
 
 @ddt.ddt
 class TestTriangleClassifier(unittest.TestCase):
@@ -156,6 +275,64 @@ class TestPartition(unittest.TestCase):
         self.assertEqual('1', self.A.classify(14))
         self.assertEqual('2', self.A.classify(17))
 
+    @ddt.data(0.0, 0.2, 1.0)
+    def testfuzzify_batch(self, over):
+        a = Partition(begin=0, end=10, peaks=[1, 2, 2.5, 6, 9], overlap=over)
+        values = np.linspace(-1, 11, 241)
+        dense = FuzzySet.memberships(a, values)
+        data, indices, indptr = a.fuzzify_batch(values)
+        self.assertEqual(len(values) + 1, len(indptr))
+        self.assertTrue((np.diff(indptr) <= 2).all())
+        sparse = np.zeros_like(dense)
+        for i in xrange(len(values)):
+            sparse[i, indices[indptr[i]:indptr[i + 1]]] = data[indptr[i]:indptr[i + 1]]
+        self.assertTrue(np.allclose(dense, sparse))
+        self.assertTrue(np.allclose(dense, a.memberships(values)))
+        self.assertEqual(FuzzySet.classify_batch(a, values).tolist(), a.classify_batch(values).tolist())
+        self.assertEqual([(k, mu) for k, mu in enumerate(dense[100]) if mu > 0], a.fuzzify(values[100]))
+
+    def testoverlap(self):
+        a = Partition(begin=0, end=10, peaks=[2, 5, 8], overlap=0.5)
+        terms = [a[name] for name in a.names]
+        self.assertAlmostEqual(terms[1].card(), _overlap(np.array(_params(terms[1])), a._trapezoids)[1])
+        self.assertAlmostEqual(0.0, _overlap(np.array((20.0, 21.0, 22.0, 23.0)), a._trapezoids).sum())
+        # прямоугольник [4, 6] и треугольник (4, 5, 6): площадь пересечения - площадь треугольника
+        self.assertAlmostEqual(1.0, _overlap(np.array((4.0, 4.0, 6.0, 6.0)), np.array([[4.0, 5.0, 5.0, 6.0]]))[0])
+        for val in (Triangle(1, 3, 4), Trapezoidal((4, 5, 7, 9))):
+            cards = [(val & term).card() for term in terms]
+            self.assertTrue(np.allclose(cards, a._overlaps(val), atol=0.01))
+
+    @ddt.data(0.2, 0.5, 0.8)
+    def testfit(self, fuzziness):
+        data = np.random.RandomState(0).lognormal(size=50000)
+        a = Partition.fit(iter(np.array_split(data, 7)), terms=5, fuzziness=fuzziness)
+        self.assertEqual(5, len(a))
+        self.assertEqual((data.min(), data.max()), (a.domain.begin, a.domain.end))
+        mu = a.memberships(data)
+        self.assertAlmostEqual(fuzziness, ((mu > 0) & (mu < 1)).any(axis=1).mean(), delta=0.02)
+        self.assertTrue(np.allclose(1.0, mu.sum(axis=1)))
+        # при overlap = 1 термы треугольные, их моды - пики; между соседними пиками - равные доли данных
+        a = Partition.fit(data, terms=5, overlap=1.0)
+        shares = np.searchsorted(np.sort(data), [a[name].mode() for name in a.names]) / float(len(data))
+        self.assertTrue(np.allclose([0.0, 0.25, 0.5, 0.75, 1.0], shares, atol=0.02))
+
+    def testfit_args(self):
+        a = Partition.fit(np.arange(100.0), terms=3, overlap=0.0)
+        self.assertEqual(['0', '1', '2'], a.classify_batch([0.0, 50.0, 99.0]).tolist())
+        self.assertAlmostEqual(24.75, a['0'].domain.end, delta=0.5)
+        self.assertEqual(2, len(Partition.fit(np.array([1.0, 1.0, 2.0, 2.0]), terms=5)))
+        self.assertRaises(ValueError, lambda: Partition.fit(np.arange(10.0), terms=1))
+        self.assertRaises(ValueError, lambda: Partition.fit([], terms=3))
+        self.assertRaises(ValueError, lambda: Partition.fit(np.ones(10), terms=3))
+        self.assertRaises(ValueError, lambda: Partition.fit(iter([np.ones(3), np.ones(2)]), terms=2))
+
+    def testfuzzify_fallback(self):
+        a = Partition(begin=0, end=10, peaks=[1, 5, 9])
+        a.add_term(Gaussian(5, 1), name='g')
+        data, indices, indptr = a.fuzzify_batch([5.0])
+        self.assertEqual([1, 3], indices.tolist())
+        self.assertEqual('1', a.classify_batch([5.0])[0])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -3,7 +3,9 @@
 
 import unittest
 import ddt
+import pickle
 import sys
+import numpy as np
 from pyinference.fuzzy.subset import *
 
 sys.path.append("..\\")
@@ -34,6 +36,17 @@ class TestSubset(unittest.TestCase):
     def test_outer_value(self):
         self.assertEqual(0.0, self.subset[1.5])
 
+    def test_breakpoints_unordered(self):
+        self.subset[0.5] = 0.5
+        self.subset[0.25] = 1.0
+        self.subset[0.75] = 0.25
+        self.assertDictEqual({0.0: 0.0, 0.25: 1.0, 0.5: 0.5, 0.75: 0.25, 1.0: 0.0}, self.subset.values)
+        self.assertAlmostEqual(0.75, self.subset[0.375])
+        self.assertAlmostEqual(0.125, self.subset[0.875])
+        self.subset[0.875] = 1.0
+        self.assertAlmostEqual(1.0, self.subset[0.875])
+        self.assertAlmostEqual(0.625, self.subset[0.8125])
+
     def testnormalize(self):
         self.subset = Subset()
         self.subset[0.75] = 0.75
@@ -49,7 +62,7 @@ class TestSubset(unittest.TestCase):
     def testlevel(self):
         res = self.subset.level(0.5)
         self.assertAlmostEqual(0.5, res.begin_tol)
-        self.assertAlmostEqual(0.834, res.end_tol)
+        self.assertAlmostEqual(0.833, res.end_tol, places=3)
         self.assertAlmostEqual(0.667, res.centr(), places=3)
 
     @ddt.data(
@@ -80,6 +93,39 @@ class TestSubset(unittest.TestCase):
         self.subset[begin] = 0.0
         self.assertAlmostEqual(card, self.subset.card())
 
+    def testlevel_exact(self):
+        self.subset.domain.acc = 3
+        res = self.subset.level(0.6)
+        self.assertAlmostEqual(0.6, res.begin_tol)
+        self.assertAlmostEqual(0.8, res.end_tol)
+        res = Trapezoidal((1.0, 2.0, 5.0, 6.0)).level(1.0)
+        self.assertAlmostEqual(2.0, res.begin_tol)
+        self.assertAlmostEqual(5.0, res.end_tol)
+
+    def testfunctionals_exact(self):
+        self.subset[0.5] = 0.25
+        card = (0.5 * 0.25 + 0.25 * (0.25 + 0.75) + 0.25 * 0.75) / 2
+        moment = 0.5 * 0.25 / 2 * (2 * 0.5) / 3 + \
+            0.25 / 6 * (0.5 * (2 * 0.25 + 0.75) + 0.75 * (0.25 + 2 * 0.75)) + \
+            0.25 / 6 * (0.75 * 2 * 0.75 + 1.0 * 0.75)
+        for acc in (3, 1000):
+            self.subset.domain.acc = acc
+            self.assertAlmostEqual(card, self.subset.card())
+            self.assertAlmostEqual(moment / card, self.subset.centr())
+            self.assertAlmostEqual(0.75, self.subset.sup())
+            self.assertAlmostEqual(0.75, self.subset.mode())
+
+    def testfunctionals_cache(self):
+        self.assertAlmostEqual(0.375, self.subset.card())
+        self.assertAlmostEqual(0.375, self.subset.card())
+        self.assertDictEqual({'hits': 1, 'misses': 1, 'size': 1}, self.subset.cache_info())
+        self.subset[0.75] = 1.0
+        self.assertAlmostEqual(0.5, self.subset.card())
+        self.assertAlmostEqual(1.0, self.subset.sup())
+        self.subset.domain.end = 0.875
+        self.assertAlmostEqual(0.5 - 0.125 * 0.5 / 2, self.subset.card())
+        self.assertDictEqual({'hits': 1, 'misses': 4, 'size': 1}, self.subset.cache_info())
+
     def testmode(self):
         self.subset = Subset()
         self.subset[0.75] = 0.75
@@ -140,7 +186,7 @@ class TestSubset(unittest.TestCase):
 
     def test__neg__(self):
         res = -self.subsetA
-        self.assertAlmostEqual(0.416, res.centr(), places=3)
+        self.assertAlmostEqual(0.417, res.centr(), places=3)
         self.assertAlmostEqual(0.0, res.mode(), places=3)
         self.assertAlmostEqual(1.0, res.sup(), places=3)
         self.assertAlmostEqual(0.667, res[0.25], places=3)
@@ -165,6 +211,31 @@ class TestSubset(unittest.TestCase):
         self.assertAlmostEqual(1.0, res[0.75], places=3)
         self.assertAlmostEqual(0.133, res[0.1], places=3)
 
+    def test_expression(self):
+        res = (self.subsetA | self.subsetB) & ~self.subset * 0.5
+        inner = res._operands[1]
+        self.assertIsInstance(res, Expression)
+        grid = res.domain.as_array()
+        a, b, c = self.subsetA.value(grid), self.subsetB.value(grid), self.subset.value(grid)
+        expected = np.minimum(np.maximum(a, b), np.clip((1 - c) * 0.5, 0.0, 1.0))
+        self.assertTrue(np.allclose(expected, res.value(grid)))
+        self.assertIsNone(res._operands)
+        self.assertEqual(0, len(inner._x))
+
+    def test_expression_lazy(self):
+        res = self.subsetA + self.subsetB
+        self.subsetB[0.25] = 0.5
+        self.assertAlmostEqual(0.833, res[0.25], places=3)
+        res[0.25] = 0.0
+        self.assertAlmostEqual(0.0, res[0.25])
+        self.assertAlmostEqual(1.0, res[0.75])
+
+    def test_expression_long_chain(self):
+        res = self.subset
+        for i in range(2000):
+            res = res * 1.0
+        self.assertAlmostEqual(0.75, res.sup())
+
 
 ##    def test__cmp__(self):
 ##        res = (self.subsetA > self.subsetB)
@@ -211,6 +282,24 @@ class TestTrapezoidal(unittest.TestCase):
     def testmedian(self):
         self.assertAlmostEqual(1.75, self.subset.median(), places=3)
 
+    def testcompact(self):
+        self.assertFalse(hasattr(self.subset, '__dict__'))
+        self.assertIs(self.subset._algebra, Triangle(0, 1, 2)._algebra)
+        points = np.linspace(-1.0, 5.0, 97)
+        compact = self.subset.value(points)
+        scalar = [self.subset.value(x) for x in points]
+        self.assertIsNone(self.subset._domain)
+        self.assertIsNone(self.subset._x)
+        self.assertDictEqual({0.0: 0.0, 1.0: 1.0, 2.0: 1.0, 4.0: 0.0}, self.subset.values)
+        self.assertListEqual(self.subset.value(points).tolist(), compact.tolist())
+        self.assertListEqual([self.subset.value(x) for x in points], scalar)
+
+    def testsetitem(self):
+        self.subset[3.0] = 1.0
+        self.assertAlmostEqual(1.0, self.subset[3.0])
+        self.assertAlmostEqual(0.5, self.subset[3.5])
+        self.assertAlmostEqual(1.0, self.subset[1.0])
+
 
 @ddt.ddt
 class TestTriangle(unittest.TestCase):
@@ -235,6 +324,18 @@ class TestTriangle(unittest.TestCase):
     def testcard(self):
         self.assertAlmostEqual(2.0, self.subset.card(), places=3)
 
+    @ddt.data(0, 1, 2)
+    def testpickle(self, protocol):
+        points = np.linspace(-1.0, 5.0, 97)
+        cached = Interval(1.5, 3.3, 0.5)
+        cached.card()
+        for subset in (self.subset, cached, Gaussian(2.3, 1.2)):
+            res = pickle.loads(pickle.dumps(subset, protocol))
+            self.assertIs(type(subset), type(res))
+            self.assertListEqual(subset.value(points).tolist(), res.value(points).tolist())
+            self.assertAlmostEqual(subset.card(), res.card())
+            self.assertIs(subset._algebra, res._algebra)
+
 
 @ddt.ddt
 class TestInterval(unittest.TestCase):
@@ -298,5 +399,152 @@ class TestGaussian(unittest.TestCase):
         self.assertAlmostEqual(3.008, self.subset.card(), places=3)
 
 
+def _sampled_subset():
+    subset = Subset()
+    subset[0.75] = 0.75
+    return subset
+
+
+@ddt.ddt
+class TestValueArray(unittest.TestCase):
+    @ddt.data(
+        (_sampled_subset(), -0.5, 1.5),
+        (Trapezoidal((0, 1, 2, 4)), -1.0, 5.0),
+        (Triangle(0, 1, 4), -1.0, 5.0),
+        (Interval(1.5, 3.3), 0.0, 4.8),
+        (Point(8.3), 8.3, 10.0),
+        (Gaussian(2.3, 1.2), -5.0, 9.0),
+    )
+    @ddt.unpack
+    def test_value_array(self, subset, begin, end):
+        points = np.linspace(begin, end, 97)
+        expected = [subset.value(x) for x in points]
+        res = subset.value(points)
+        self.assertTupleEqual(points.shape, res.shape)
+        self.assertTrue(np.allclose(expected, res))
+        self.assertTupleEqual((8, 2), subset.value(points[:16].reshape((8, 2))).shape)
+
+
+class TestNumbersAlgebra(unittest.TestCase):
+    def setUp(self):
+        self.algebra = NumbersAlgebra(levels=5)
+        self.A = self.algebra.number(Triangle(1.0, 2.0, 3.0))
+        self.B = self.algebra.number(Trapezoidal((2.0, 3.0, 4.0, 6.0)))
+
+    def test_number(self):
+        self.assertListEqual([1.0, 1.25, 1.5, 1.75, 2.0], self.A.lo.tolist())
+        self.assertListEqual([3.0, 2.75, 2.5, 2.25, 2.0], self.A.hi.tolist())
+        self.assertListEqual([6.0, 5.5, 5.0, 4.5, 4.0], self.B.hi.tolist())
+        self.assertAlmostEqual(0.5, self.A[2.5])
+        self.assertAlmostEqual(1.0, self.A.card())
+
+    def test_number_support(self):
+        C = Subset(0.0, 4.0)
+        C[1.0] = 0.0
+        C[2.0] = 1.0
+        lo, hi = self.algebra.number(C).lo, self.algebra.number(C).hi
+        self.assertAlmostEqual(1.0, lo[0])
+        self.assertAlmostEqual(4.0, hi[0])
+        self.assertAlmostEqual(2.0, lo[-1])
+
+    def test_add(self):
+        C = self.A + self.B
+        self.assertIsInstance(C, Number)
+        self.assertListEqual([3.0, 3.5, 4.0, 4.5, 5.0], C.lo.tolist())
+        self.assertListEqual([9.0, 8.25, 7.5, 6.75, 6.0], C.hi.tolist())
+
+    def test_sub(self):
+        C = self.A - self.B
+        self.assertListEqual([-5.0, -4.25, -3.5, -2.75, -2.0], C.lo.tolist())
+        self.assertListEqual([1.0, 0.5, 0.0, -0.5, -1.0], C.hi.tolist())
+
+    def test_mul(self):
+        C = self.A * (self.B - 3.0)
+        self.assertAlmostEqual(-3.0, C.lo[0])
+        self.assertAlmostEqual(9.0, C.hi[0])
+        self.assertAlmostEqual(0.0, C.lo[-1])
+        self.assertAlmostEqual(2.0, C.hi[-1])
+
+    def test_div(self):
+        C = self.B / self.A
+        self.assertAlmostEqual(2.0 / 3.0, C.lo[0])
+        self.assertAlmostEqual(6.0, C.hi[0])
+        self.assertAlmostEqual(1.5, C.lo[-1])
+        self.assertAlmostEqual(2.0, C.hi[-1])
+        self.assertRaises(ZeroDivisionError, lambda: self.B / (self.A - 2.0))
+
+    def test_min_max(self):
+        C = self.A.min(self.B)
+        D = self.A.max(self.B)
+        self.assertListEqual(self.A.lo.tolist(), C.lo.tolist())
+        self.assertListEqual(self.B.hi.tolist(), D.hi.tolist())
+        self.assertListEqual([2.0, 2.25, 2.5, 2.75, 3.0], D.lo.tolist())
+
+    def test_chain(self):
+        C = self.A
+        for i in range(100):
+            C = C + self.A
+        self.assertAlmostEqual(101 * 2.0, C.mode())
+        self.assertAlmostEqual(101 * 1.0, C.lo[0])
+        self.assertAlmostEqual(101 * 3.0, C.hi[0])
+
+    def test_extend_monotone(self):
+        C = self.algebra.extend(lambda x, y: x * y, [self.A, self.B], monotone=True)
+        D = self.A * self.B
+        self.assertTrue(np.allclose(D.lo, C.lo))
+        self.assertTrue(np.allclose(D.hi, C.hi))
+
+    def test_extend_grid(self):
+        C = self.algebra.extend(lambda x, y, z: (x - 2.0) ** 2 + y * z, [self.A, self.B, -1.0], samples=5)
+        self.assertIsInstance(C.domain, pyinference.fuzzy.domain.RationalRange)
+        self.assertAlmostEqual(-6.0, C.lo[0])
+        self.assertAlmostEqual(-1.0, C.hi[0])
+        self.assertAlmostEqual(-4.0, C.lo[-1])
+        self.assertAlmostEqual(-3.0, C.hi[-1])
+        self.assertTrue(np.all(np.diff(C.lo) >= 0))
+        self.assertTrue(np.all(np.diff(C.hi) <= 0))
+
+
+class TestTrapezoidArray(unittest.TestCase):
+    def setUp(self):
+        self.subsets = [Trapezoidal((0, 1, 2, 4)), Triangle(1.0, 2.0, 4.0), Interval(0.5, 1.5), Point(2.0)]
+        self.array = TrapezoidArray.from_subsets(self.subsets)
+
+    def test_conversion(self):
+        self.assertTupleEqual((4, 4), self.array.params.shape)
+        self.assertEqual(4, len(self.array))
+        for subset, converted in zip(self.subsets[:2], self.array.tolist()):
+            self.assertDictEqual(subset.values, converted.values)
+        self.assertDictEqual(self.subsets[1].values, self.array[1].values)
+        self.assertEqual(2, len(self.array[1:3]))
+
+    def test_value(self):
+        points = np.linspace(-1.0, 5.0, 25)
+        res = self.array.value(points)
+        self.assertTupleEqual((4, 25), res.shape)
+        for subset, row in zip(self.subsets[:2], res):
+            self.assertTrue(np.allclose([subset.value(x) for x in points], row))
+
+    def test_functionals(self):
+        self.assertTrue(np.allclose([s.card() for s in self.subsets], self.array.card()))
+        self.assertTrue(np.allclose([s.centr() for s in self.subsets[:2]] + [1.0, 2.0], self.array.centr()))
+        self.assertListEqual([1.5, 2.0, 1.0, 2.0], self.array.mom().tolist())
+        self.assertListEqual([1.0, 2.0, 0.5, 2.0], self.array.mode().tolist())
+        self.assertListEqual([1.75, 2.25, 1.0, 2.0], self.array.median().tolist())
+
+    def test_arithmetic(self):
+        res = self.array - self.array
+        self.assertListEqual([-4.0, -1.0, 1.0, 4.0], res.params[0].tolist())
+        algebra = NumbersAlgebra(levels=2)
+        for one, other in zip(self.subsets[:2], self.subsets[1:3]):
+            pair = TrapezoidArray.from_subsets([one]) * TrapezoidArray.from_subsets([other])
+            ref = algebra.number(one) * other
+            self.assertListEqual([ref.lo[0], ref.lo[1], ref.hi[1], ref.hi[0]], pair.params[0].tolist())
+        self.assertListEqual([0.0, 0.5, 1.0, 2.0], (self.array / 2.0).params[0].tolist())
+        self.assertRaises(ZeroDivisionError, lambda: self.array / self.array[:1])
+        self.assertListEqual([0.0, 1.0, 2.0, 2.0], self.array.min(2.0).params[0].tolist())
+        self.assertListEqual([2.0, 2.0, 2.0, 4.0], self.array.max(2.0).params[0].tolist())
+
+
 if __name__ == '__main__':
     unittest.main()
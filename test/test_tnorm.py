@@ -4,6 +4,7 @@
 import unittest
 import ddt
 import sys
+import numpy as np
 from pyinference.fuzzy.tnorm import *
 
 sys.path.append("..\\")
@@ -254,5 +255,90 @@ class TestTnorm7(unittest.TestCase):
         pass
 
 
+@ddt.ddt
+class TestVectorized(unittest.TestCase):
+    # значения нормы и конормы в узлах i = 0, 0.5, 1 (строки) и j = 0, 0.3, 1 (столбцы) по исходным скалярным
+    # формулам; конормы Tnorm3 и Tnorm6 - двойственные к нормам, S(i, j) = 1 - T(1 - i, 1 - j)
+    @ddt.data(
+        (MinMax(), [[0, 0, 0], [0, 0.3, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.5, 1], [1, 1, 1]]),
+        (SumProd(), [[0, 0, 0], [0, 0.15, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.65, 1], [1, 1, 1]]),
+        (Margin(), [[0, 0, 0], [0, 0, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.8, 1], [1, 1, 1]]),
+        (Drastic(), [[0, 0, 0], [0, 0, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 1, 1], [1, 1, 1]]),
+        (Tnorm1(0.5), [[0, 0, 0], [0, 0.1818, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.6216, 1], [1, 1, 1]]),
+        (Tnorm2(0.5), [[0, 0, 0], [0, 0.3, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.5, 1], [1, 1, 1]]),
+        (Tnorm3(2.0), [[0, 0, 0], [0, 0.2826, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.5211, 1], [1, 1, 1]]),
+        (Tnorm4(2.0), [[0, 0, 0], [0, 0.2142, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.5635, 1], [1, 1, 1]]),
+        (Tnorm5(2.0), [[0, 0, 0], [0, 0.1398, 0.5], [0, 0.3, 1]], [[0, 0.09, 1], [0.25, 0.34, 1], [1, 1, 1]]),
+        (Tnorm6(2.0), [[0, 0, 0], [0, 0.1319, 0.5], [0, 0.3, 1]], [[0, 0.3, 1], [0.5, 0.6681, 1], [1, 1, 1]]),
+        (Tnorm7(0.5), [[0, 0, 0], [0, 0, 0.5], [0, 0.3, 1]], [[-1, -0.7, 0], [-0.5, -0.125, 0.75], [0, 0.45, 1]]),
+    )
+    @ddt.unpack
+    def test_broadcast(self, norm, norm_expected, conorm_expected):
+        i = np.array([0.0, 0.5, 1.0])
+        j = np.array([0.0, 0.3, 1.0])
+        for method, expected in ((norm.norm, norm_expected), (norm.conorm, conorm_expected)):
+            res = method(i[:, None], j)
+            self.assertTupleEqual((3, 3), res.shape)
+            self.assertTrue(np.allclose(expected, res, atol=1e-4))
+            for row, x in enumerate(i):
+                for col, y in enumerate(j):
+                    self.assertAlmostEqual(expected[row][col], method(x, y), places=4)
+
+    @ddt.data(MinMax(), SumProd(), Margin(), Drastic(), Tnorm3(2.0), Tnorm7(0.5))
+    def test_reduce(self, norm):
+        array = np.array([[0.9, 0.4, 1.0], [0.5, 1.0, 0.2], [0.0, 0.7, 0.6]])
+        res = norm.reduce(array, axis=1)
+        expected = [norm.norm(norm.norm(row[0], row[1]), row[2]) for row in array]
+        self.assertTrue(np.allclose(expected, res))
+        res = norm.reduce_conorm(array, axis=0)
+        expected = [norm.conorm(norm.conorm(col[0], col[1]), col[2]) for col in array.T]
+        self.assertTrue(np.allclose(expected, res))
+        self.assertListEqual([1.0, 1.0], norm.reduce(np.empty((2, 0)), axis=1).tolist())
+
+    def test_masks(self):
+        res = Tnorm3(2.0).norm(np.array([0.0, 0.5, 1.0]), np.array([0.5, 0.0, 1.0]))
+        self.assertListEqual([0.0, 0.0, 1.0], res.tolist())
+        self.assertEqual(0.0, Tnorm3(2.0).norm(0.0, 0.5))
+        self.assertListEqual([0.0, 0.0], Tnorm6(1).norm(np.array([0.5, 1.0]), 0.5).tolist())
+        res = Tnorm3(2.0).conorm(np.array([1.0, 0.3, 0.0, 0.3, 0.0, 1.0]), np.array([0.3, 1.0, 0.3, 0.0, 0.0, 0.0]))
+        self.assertListEqual([1.0, 1.0, 0.3, 0.3, 0.0, 1.0], res.tolist())
+        self.assertEqual(1.0, Tnorm3(2.0).conorm(1.0, 0.3))
+        self.assertEqual(0.3, Tnorm3(2.0).conorm(0.0, 0.3))
+        self.assertAlmostEqual(1 - Tnorm3(2.0).norm(0.8, 0.7), Tnorm3(2.0).conorm(0.2, 0.3))
+        self.assertAlmostEqual(0.8642, Tnorm3(2).norm(0.9, 0.9), places=4)
+        self.assertAlmostEqual(Tnorm3(2.0).conorm(0.3, 0.5), Tnorm3(2).conorm(0.3, 0.5))
+        self.assertListEqual([1.0, 1.0], Tnorm6(1).conorm(np.array([0.0, 0.5]), 0.5).tolist())
+        self.assertAlmostEqual(1 - Tnorm6(2.0).norm(0.7, 0.5), Tnorm6(2.0).conorm(0.3, 0.5))
+
+
+@ddt.ddt
+class TestLookupNorm(unittest.TestCase):
+    @ddt.data((MinMax(), False), (MinMax(), True), (SumProd(), False), (Margin(), True))
+    @ddt.unpack
+    def test_error_bound(self, norm, interpolate):
+        lut = LookupNorm(norm, size=101, interpolate=interpolate)
+        bound = 1.0 / 100 * (2 if interpolate else 1)
+        i = np.random.rand(50)[:, None]
+        j = np.random.rand(40)
+        self.assertLessEqual(np.abs(lut.norm(i, j) - norm.norm(i, j)).max(), bound)
+        self.assertLessEqual(np.abs(lut.conorm(i, j) - norm.conorm(i, j)).max(), bound)
+        self.assertLessEqual(lut.error(), bound)
+
+    def test_nodes(self):
+        norm = Tnorm6(2.0)
+        lut = LookupNorm(norm, size=5)
+        grid = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+        self.assertTrue(np.allclose(norm.norm(grid[:, None], grid), lut.norm(grid[:, None], grid)))
+        self.assertAlmostEqual(norm.norm(0.25, 1.0), lut.norm(0.25, 1.0))
+        self.assertEqual(lut.norm(0.0, 1.0), lut.norm(-0.5, 1.5))
+
+    def test_bilinear(self):
+        lut = LookupNorm(SumProd(), size=3, interpolate=True)
+        self.assertAlmostEqual(0.21, lut.norm(0.3, 0.7))
+        self.assertAlmostEqual(0.79, lut.conorm(0.3, 0.7))
+        self.assertLess(lut.error(), 1e-12)
+        self.assertAlmostEqual(0.06, lut.reduce(np.array([0.3, 0.5, 0.4])))
+
+
 if __name__ == '__main__':
     unittest.main()